@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importat després de configurar Django
+from events.live import LIVE_PATH, live_status_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Les connexions d'estat en directe (Server-Sent Events) no passen per Django
+    if scope['type'] == 'http' and LIVE_PATH.match(scope['path']):
+        await live_status_app(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
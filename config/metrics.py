@@ -0,0 +1,378 @@
+"""
+Counters and histograms exported in the Prometheus text format at /metrics.
+
+Each process keeps its samples in memory. With several worker processes
+set METRICS_DIR to a directory shared by all of them: every process writes
+a snapshot of its own samples there (at most every FLUSH_INTERVAL seconds
+and at exit) and /metrics adds up the snapshots of every process, so the
+answer does not depend on the worker that serves it. The snapshots of
+processes that have exited are folded into one aggregate file, so counters
+keep their totals and the directory does not grow with every restarted
+worker. Folding checks whether a process is alive by pid, so the directory
+must be shared only by the processes of one host (other hosts' snapshots
+are never folded).
+"""
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: les instantànies no es pleguen
+    fcntl = None
+
+PREFIX = 'streamevents_'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FLUSH_INTERVAL = 1.0
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+AGGREGATE_NAME = 'aggregate.json'
+LOCK_NAME = '.fold.lock'
+HOSTNAME = socket.gethostname()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects the labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def describe(self):
+        return {'type': self.kind, 'help': self.documentation, 'labels': self.labelnames}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+        self.registry.changed()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Comptes per interval (no acumulats): [bucket..., +Inf, suma]
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+        self.registry.changed()
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def describe(self):
+        return {**super().describe(), 'buckets': self.buckets}
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty = False
+        self._pid = None
+        self._snapshot_name = None
+        atexit.register(self.flush)
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        name = PREFIX + name
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+        if not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f'{name} is already registered with another type or labels')
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {**metric.describe(), 'samples': [
+                    [list(key), list(value) if isinstance(value, list) else value]
+                    for key, value in metric.samples.items()
+                ]}
+                for name, metric in self.metrics.items()
+            }
+
+    def directory(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        return Path(directory) if directory else None
+
+    def changed(self):
+        self._dirty = True
+        if self._pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        """
+        One snapshot file and one flushing thread per process, also in
+        workers forked from a process that already had samples.
+        """
+        with self._flush_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._snapshot_name = f'{HOSTNAME}-{self._pid}-{time.time_ns()}.json'
+        if self.directory() is None:
+            return
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        # Les peticions no escriuen mai al disc: aquest fil ho fa com a molt cada FLUSH_INTERVAL
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        """
+        Writes this process snapshot to METRICS_DIR (atomically, so readers
+        never see half a file). Does nothing without METRICS_DIR.
+        """
+        try:
+            directory = self.directory()
+        except Exception:
+            # Settings no configurats (p. ex. a l'atexit d'un procés sense Django)
+            return
+        if directory is None or self._pid != os.getpid():
+            return
+        with self._flush_lock:
+            self._dirty = False
+            directory.mkdir(parents=True, exist_ok=True)
+            write_atomic(directory / self._snapshot_name, self.snapshot())
+
+    def collect(self):
+        """
+        Returns the samples of every process: {name: description + samples},
+        where samples maps label values to a number or histogram counts.
+        """
+        directory = self.directory()
+        if directory is None:
+            return merge_snapshots([self.snapshot()])
+        self.flush()
+        self.fold_dead_snapshots(directory)
+        aggregate = read_aggregate(directory)
+        snapshots = [aggregate['metrics']]
+        for path in directory.glob('*.json'):
+            if path.name == AGGREGATE_NAME or path.name in aggregate['folded']:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return merge_snapshots(snapshots)
+
+    def fold_dead_snapshots(self, directory):
+        """
+        Adds the snapshots of this host's processes that no longer exist to
+        the aggregate file and deletes them. The aggregate lists the files
+        it already contains, so a crash between writing it and deleting the
+        snapshots never counts them twice.
+        """
+        if fcntl is None:
+            return
+        dead = [path for path in directory.glob(f'{HOSTNAME}-*.json') if not snapshot_alive(path.name)]
+        if not dead:
+            return
+        with open(directory / LOCK_NAME, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                aggregate = read_aggregate(directory)
+                folded = {name for name in aggregate['folded'] if (directory / name).exists()}
+                snapshots = [aggregate['metrics']]
+                for path in dead:
+                    if path.name in folded:
+                        continue
+                    try:
+                        snapshots.append(json.loads(path.read_text()))
+                    except FileNotFoundError:
+                        # Ja l'ha plegat un altre procés
+                        continue
+                    except (OSError, ValueError):
+                        pass
+                    folded.add(path.name)
+                write_atomic(directory / AGGREGATE_NAME, {
+                    'folded': sorted(folded),
+                    'metrics': as_snapshot(merge_snapshots(snapshots)),
+                })
+                for path in dead:
+                    path.unlink(missing_ok=True)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def render(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f'# HELP {name} {escape_help(metric["help"])}')
+            lines.append(f'# TYPE {name} {metric["type"]}')
+            for key, value in sorted(metric['samples'].items()):
+                labels = list(zip(metric['labels'], key))
+                if metric['type'] == 'counter':
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip([*metric['buckets'], '+Inf'], value[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else format_value(bound)
+                    lines.append(f'{name}_bucket{format_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {format_value(value[-1])}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def write_atomic(path, data):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def read_aggregate(directory):
+    try:
+        return json.loads((directory / AGGREGATE_NAME).read_text())
+    except (OSError, ValueError):
+        return {'folded': [], 'metrics': {}}
+
+
+def snapshot_alive(name):
+    """
+    Whether the process that writes the snapshot `name`
+    (<host>-<pid>-<start>.json) of this host is still running.
+    """
+    try:
+        host, pid, _ = name[:-len('.json')].rsplit('-', 2)
+        pid = int(pid)
+    except ValueError:
+        return True
+    if host != HOSTNAME:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_snapshots(snapshots):
+    """
+    Adds up snapshots into {name: description + {label values: value}}.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'samples': {}})
+            for key, value in metric['samples']:
+                key = tuple(key)
+                current = target['samples'].get(key)
+                if current is None:
+                    target['samples'][key] = value
+                elif isinstance(value, list):
+                    target['samples'][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target['samples'][key] = current + value
+    return merged
+
+
+def as_snapshot(merged):
+    return {
+        name: {**metric, 'samples': [[list(key), value] for key, value in metric['samples'].items()]}
+        for name, metric in merged.items()
+    }
+
+
+def escape_help(text):
+    return text.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def escape_label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+
+# Mètodes que es fan servir d'etiqueta; la resta (arbitraris) s'agrupen com a 'other'
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+REQUESTS = counter('http_requests_total', 'HTTP requests by URL name, method and status.', ('view', 'method', 'status'))
+REQUEST_LATENCY = histogram('http_request_duration_seconds', 'HTTP request latency by URL name.', ('view', 'method'))
+
+
+class MetricsMiddleware:
+    """
+    Counts and times every request, labelled with its URL name (for
+    instance events:event_list) so the cardinality stays bounded; requests
+    that match no URL are grouped under 'unmatched'.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        REQUESTS.inc(view=view, method=method, status=response.status_code)
+        REQUEST_LATENCY.observe(duration, view=view, method=method)
+        return response
@@ -0,0 +1,117 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary ('default'). Reads go to the 'replica'
+alias only while ReplicaRoutingMiddleware serves a GET/HEAD request of a
+view listed in DATABASE_REPLICA_VIEWS; everything else (management
+commands, the scheduler, forms that write) keeps reading the primary.
+
+Read-your-writes: a request that writes sets a short-lived cookie, and the
+requests of that client read the primary until it expires, so the user
+never sees a replica that has not caught up with their own change yet.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+        self.primary_only = 0
+
+
+def replica_available():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def primary_reads():
+    """
+    Reads the primary inside the block, also in replica-routed views. Used
+    for anything whose result outlives the request (cached pages and
+    fragments): a lagging replica would otherwise store pre-write data
+    under the new cache version until it expires.
+    """
+    state = _routing.get()
+    if state is None:
+        yield
+        return
+    state.primary_only += 1
+    try:
+        yield
+    finally:
+        state.primary_only -= 1
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (
+            state is None or not state.use_replica or state.wrote or state.primary_only
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or not replica_available()
+        ):
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # La resta de lectures de la petició (i les següents del client) van a la primària
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La rèplica rep l'esquema i les dades per replicació
+        return db != REPLICA_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets the router send the reads of read-only views to the replica and
+    pins a client to the primary for DATABASE_STICKY_SECONDS after it writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'DATABASE_STICKY_COOKIE', 'db_primary')
+        self.sticky_seconds = getattr(settings, 'DATABASE_STICKY_SECONDS', 10)
+        self.replica_views = set(getattr(settings, 'DATABASE_REPLICA_VIEWS', ()))
+
+    def __call__(self, request):
+        state = RoutingState()
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if state.wrote and self.sticky_seconds:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.sticky_seconds,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _routing.get()
+        if state is None or state.wrote or request.method not in ('GET', 'HEAD'):
+            return None
+        if request.COOKIES.get(self.cookie_name):
+            return None
+        state.use_replica = request.resolver_match.view_name in self.replica_views
+        return None
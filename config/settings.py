@@ -13,7 +13,10 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 from pathlib import Path
 import os  # MOD: Afegit per poder usar rutes/variables entorn
 
+from dotenv import load_dotenv
+
 BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(BASE_DIR / '.env')  # MOD: Variables d'entorn del fitxer .env (veure env.example)
 
 SECRET_KEY = 'django-insecure-y$1u2*vp6rs)=3^$yl#4)&6y1k7nx0f!3pfir4_d3n=1r3)1%w'  # MOD: En producció usar variable d'entorn
 DEBUG = True  # MOD: Posar False en producció
@@ -31,11 +34,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.timing.RequestTimingMiddleware',  # MOD: Temps per petició (REQUEST_TIMING); ha de ser el primer
+    'config.metrics.MetricsMiddleware',  # MOD: Peticions i latència per nom d'URL (METRICS_ENABLED)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',  # MOD: Usuari autenticat en memòria (AUTH_USER_CACHE_TIMEOUT)
+    'config.routers.ReplicaRoutingMiddleware',  # MOD: Lectures a la rèplica i read-your-writes
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -44,7 +50,7 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'config.timing.TimedDjangoTemplates',  # MOD: DjangoTemplates que mesura el temps de render
         'DIRS': [BASE_DIR / 'templates'],  # MOD: Carpeta global de plantilles
         'APP_DIRS': True,
         'OPTIONS': {
@@ -62,16 +68,67 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # MOD: Canvi de base de dades (sqlite -> MongoDB via djongo)
+# MOD: Opcions del pool de connexions de pymongo, configurables per entorn
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', 100)),
+    'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+    'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000)),
+    'connectTimeoutMS': int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+    'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    'socketTimeoutMS': int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 20000)),
+    'retryWrites': True,
+}
 DATABASES = {
     'default': {  # MOD
         'ENGINE': 'djongo',  # MOD: Motor djongo
-        'NAME': 'streamevents_db',  # MOD: Nom BBDD
+        'NAME': os.environ.get('DB_NAME', 'streamevents_db'),  # MOD: Nom BBDD
         'ENFORCE_SCHEMA': True,  # MOD: Validació d'esquema
         'CLIENT': {  # MOD
-            'host': 'mongodb://localhost:27017'  # MOD: Connexió Mongo
+            'host': os.environ.get('MONGO_URL', 'mongodb://localhost:27017'),  # MOD: Connexió Mongo
+            **MONGO_CLIENT_OPTIONS,
         }  # MOD
     }  # MOD
 }
+# MOD: Lectures de llistats, detalls i perfils a un secundari del replica set
+# (config.routers). Desactivat amb MONGO_READ_PREFERENCE=primary.
+MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'secondaryPreferred')
+if MONGO_READ_PREFERENCE != 'primary':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'CLIENT': {
+            **DATABASES['default']['CLIENT'],
+            'host': os.environ.get('MONGO_REPLICA_URL') or DATABASES['default']['CLIENT']['host'],  # Buit: MONGO_URL
+            'readPreference': MONGO_READ_PREFERENCE,
+            'maxStalenessSeconds': int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', -1)),
+        },
+        'TEST': {'MIRROR': 'default'},  # Als tests la rèplica és la mateixa connexió
+    }
+DATABASE_ROUTERS = ['config.routers.PrimaryReplicaRouter']
+DATABASE_REPLICA_VIEWS = [
+    'events:event_list',
+    'events:events_by_category',
+    'events:event_detail',
+    'events:api_event_list',
+    'events:api_event_detail',
+    'events:api_event_export',
+    'users:profile',
+    'users:public_profile',
+]
+DATABASE_STICKY_SECONDS = 10  # Lectures a la primària després d'escriure (read-your-writes)
+
+# MOD: Memòria cau (destacats, recomptes...). LocMem per defecte; en producció amb
+# diversos processos convé un backend compartit (fitxers, Redis, Memcached...)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'streamevents',
+    }
+}
+if os.environ.get('CACHE_DIR'):  # MOD: Memòria cau en fitxers compartida entre processos
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['CACHE_DIR'],
+    }
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -91,9 +148,17 @@ STATICFILES_DIRS = [BASE_DIR / "static"]  # MOD (opcional si tens carpeta pròpi
 
 MEDIA_URL = '/media/'  # MOD: Suport fitxers pujats
 MEDIA_ROOT = BASE_DIR / 'media'  # MOD: Directori media
+DEFAULT_FILE_STORAGE = 'config.storage.ContentAddressedStorage'  # MOD: Noms per hash del contingut (deduplicació)
+SERVE_MEDIA = False  # MOD: Servir /media/ des de Django també amb DEBUG=False
+
+# MOD: Pujades d'imatges en streaming amb límits (config.uploads)
+FILE_UPLOAD_HANDLERS = ['config.uploads.ImageUploadHandler']
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB
+MAX_IMAGE_PIXELS = 40_000_000  # p. ex. 8000x5000
 
 AUTH_USER_MODEL = 'users.CustomUser'  # MOD: Model d'usuari personalitzat (definir abans primer migrate)
 
+AUTHENTICATION_BACKENDS = ['users.backends.UsernameOrEmailBackend']  # MOD: Usuari o correu amb un sol hash
 LOGIN_URL = 'login'  # MOD: Nom URL login
 LOGIN_REDIRECT_URL = 'home'  # MOD: Destí després d'iniciar sessió
 LOGOUT_REDIRECT_URL = 'login'  # MOD: Destí després de tancar sessió
@@ -109,7 +174,78 @@ MESSAGE_TAGS = {  # MOD: Adaptació a classes Bootstrap
     messages.ERROR: 'danger',
 }
 
+# MOD: Sessions. 'cached_db' (memòria cau + BD) o 'signed_cookies' (sense accés a BD;
+# la sessió viatja signada a la galeta i no es pot invalidar des del servidor)
+SESSION_MODE = os.environ.get('SESSION_MODE', 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+# Segons que cada procés guarda l'usuari autenticat (users.middleware; 0 = desactivat)
+AUTH_USER_CACHE_TIMEOUT = 30
+
 # (Opcional futur producció)
 # CSRF_COOKIE_SECURE = True  # MOD
 # SESSION_COOKIE_SECURE = True  # MOD
 # SECURE_HSTS_SECONDS = 3600  # MOD
+
+# Paginació de les llistes d'esdeveniments: 'cursor' (keyset, sense COUNT) o 'page' (numerada)
+EVENTS_PAGINATION = 'cursor'
+EVENTS_APPROXIMATE_COUNT = False  # Mostra un recompte aproximat (en memòria cau) a la paginació per cursor
+EVENTS_PAGE_CACHE_TIMEOUT = 300  # Segons de memòria cau de les pàgines públiques (0 = desactivada)
+
+# Pressupost de consultes per vista (events.querybudget): activar-ho als tests
+QUERY_BUDGETS_ENFORCED = False
+
+# Processos que generen les mides de les miniatures (0 = dins la mateixa petició)
+THUMBNAIL_WORKERS = 2
+
+# Hosts que Twitch ha de permetre per incrustar el reproductor (paràmetre `parent`).
+# Després de canviar-los cal executar backfill_stream_embeds.
+STREAM_EMBED_PARENTS = ['localhost', '127.0.0.1']
+
+# Avisos d'estat en directe (events.live). Només funcionen servint config.asgi
+# amb un servidor ASGI (uvicorn, daphne...). El CacheBackend reparteix els avisos
+# entre processos: cal una memòria cau compartida (CACHE_DIR o similar).
+LIVE_UPDATES = False
+LIVE_BACKEND = 'events.live.LocalBackend'
+
+# Creadors amb més seguidors que això no es copien al feed de cada seguidor
+# (events.feed): els seus esdeveniments es llegeixen en mostrar el feed
+FEED_FANOUT_LIMIT = 1000
+
+# MOD: Temps de BD, plantilles i vista per petició (config.timing): capçalera Server-Timing
+# i log mostrejat de peticions/consultes lentes. None el desactiva sense cost.
+REQUEST_TIMING = {
+    'slow_request_ms': int(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'slow_query_ms': int(os.environ.get('SLOW_QUERY_MS', 100)),
+    'sample_rate': float(os.environ.get('SLOW_LOG_SAMPLE_RATE', 1.0)),
+    'server_timing': DEBUG,  # Només en desenvolupament: no exposar temps interns
+}
+
+# MOD: Mètriques Prometheus a /metrics (config.metrics). Amb diversos processos,
+# METRICS_DIR ha de ser un directori local compartit pels processos del servidor.
+# /metrics només respon amb la capçalera "Authorization: Bearer <METRICS_TOKEN>":
+# sense token no s'exposa (la IP no serveix darrere d'un proxy invers local).
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'config.timing': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Límit d'intents d'inici de sessió (users.throttle): (ràfega, intents per segon)
+# per compte i per IP. None el desactiva.
+LOGIN_THROTTLE = {
+    'account': (10, 1 / 30),
+    'ip': (50, 1),
+}
@@ -0,0 +1,30 @@
+"""
+Settings for the view benchmarks (python manage.py benchmark_views).
+
+Same project settings on a local SQLite database, so the suite runs
+anywhere without MongoDB:
+
+    DJANGO_SETTINGS_MODULE=config.settings_bench python manage.py benchmark_views
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCH_DB', BASE_DIR / 'bench.sqlite3'),
+    }
+}
+
+# Base de dades d'usar i llençar: benchmark_views s'hi nega a qualsevol altra
+BENCHMARK_DATABASE = True
+
+# Es mesuren les vistes, no la memòria cau de pàgines
+EVENTS_PAGE_CACHE_TIMEOUT = 0
+THUMBNAIL_WORKERS = 0
+MEDIA_ROOT = BASE_DIR / 'bench_media'
+# Els escenaris de login repeteixen el mateix compte i IP moltes vegades
+LOGIN_THROTTLE = None
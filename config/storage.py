@@ -0,0 +1,51 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Filesystem storage that names every upload after the SHA-256 of its
+    content: <upload_to>/<2 first hex chars>/<hash><ext>.
+
+    Identical uploads map to the same file, so they are stored only once,
+    and a name never changes content, so it can be cached forever.
+    Unreferenced blobs are removed by the gc_media command.
+    """
+
+    def _save(self, name, content):
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        content_hash = digest.hexdigest()
+
+        name = posixpath.join(directory, content_hash[:2], content_hash + extension)
+        if self.exists(name):
+            # Mateix contingut: reutilitzem el fitxer que ja hi ha. Actualitzem
+            # la data perquè gc_media no l'esborri mentre es desa la referència.
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+
+def content_etag(name):
+    """
+    Returns an ETag for a content-addressed name (an upload or one of its
+    renditions, "<hash>_<rendition>"), or None for any other file.
+    """
+    stem = os.path.splitext(posixpath.basename(name))[0]
+    content_hash = stem.split('_', 1)[0]
+    if len(content_hash) == 64 and all(c in '0123456789abcdef' for c in content_hash):
+        return f'"{stem}"'
+    return None
@@ -0,0 +1,204 @@
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+
+from events.models import Event
+
+from . import metrics
+from .routers import PrimaryReplicaRouter, ReplicaRoutingMiddleware, primary_reads
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='secret')
+class MetricsTests(SimpleTestCase):
+    """
+    /metrics needs the bearer token, and the snapshots of processes that
+    have exited are folded into the aggregate file without losing counts.
+    """
+
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = Path(temporary.name)
+        directory_setting = override_settings(METRICS_DIR=temporary.name)
+        directory_setting.enable()
+        self.addCleanup(directory_setting.disable)
+        self.registry = metrics.Registry()
+        self.requests = self.registry.counter('test_requests_total', 'Test requests.', ('view',))
+
+    def write_snapshot(self, name, value):
+        registry = metrics.Registry()
+        registry.counter('test_requests_total', 'Test requests.', ('view',)).samples[('home',)] = value
+        (self.directory / name).write_text(json.dumps(registry.snapshot()))
+
+    def total(self):
+        samples = self.registry.collect()['streamevents_test_requests_total']['samples']
+        return samples.get(('home',), 0)
+
+    def test_requires_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_disabled_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+
+    def test_folds_dead_processes(self):
+        self.requests.inc(view='home')
+        self.write_snapshot(f'{metrics.HOSTNAME}-{dead_pid()}-1.json', 2)
+        self.write_snapshot(f'{metrics.HOSTNAME}-{dead_pid()}-2.json', 3)
+        self.assertEqual(self.total(), 6)
+
+        # Només queden la instantània del procés viu i l'agregat
+        self.assertEqual(len(list(self.directory.glob('*.json'))), 2)
+        self.write_snapshot(f'{metrics.HOSTNAME}-{dead_pid()}-3.json', 4)
+        self.assertEqual(self.total(), 10)
+
+    def test_keeps_live_and_other_hosts_snapshots(self):
+        self.write_snapshot(f'{metrics.HOSTNAME}-{metrics.os.getpid()}-1.json', 2)
+        self.write_snapshot(f'un-altre-host-{dead_pid()}-1.json', 3)
+        self.assertEqual(self.total(), 5)
+        self.assertEqual(len(list(self.directory.glob('*.json'))), 2)
+
+    def test_does_not_fold_twice(self):
+        # Una caiguda entre escriure l'agregat i esborrar les instantànies
+        name = f'{metrics.HOSTNAME}-{dead_pid()}-1.json'
+        self.write_snapshot(name, 2)
+        self.registry.fold_dead_snapshots(self.directory)
+        self.write_snapshot(name, 2)
+        self.assertEqual(self.total(), 2)
+        self.assertFalse((self.directory / name).exists())
+
+
+@override_settings(DATABASE_REPLICA_VIEWS=['events:event_list'], DATABASE_STICKY_SECONDS=10)
+class RouterTests(SimpleTestCase):
+    """
+    Reads of replica views go to the replica until the request writes,
+    while a client is sticky after a write, and inside atomic blocks and
+    primary_reads().
+    """
+    databases = {'default'}
+
+    def setUp(self):
+        patcher = mock.patch('config.routers.replica_available', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = PrimaryReplicaRouter()
+
+    def serve(self, path='/events/', method='get', cookies=None, during=None):
+        """
+        Runs a request through the middleware and returns (the alias of a
+        read made by the view after `during()`, response).
+        """
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        reads = []
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            if during:
+                during()
+            reads.append(self.router.db_for_read(Event))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        response = middleware(request)
+        return reads[0], response
+
+    def test_replica_views(self):
+        self.assertEqual(self.serve()[0], 'replica')
+        self.assertEqual(self.serve('/events/my-events/')[0], 'default')
+        self.assertEqual(self.serve(method='post')[0], 'default')
+        # Fora d'una petició (comandes, scheduler) sempre la primària
+        self.assertEqual(self.router.db_for_read(Event), 'default')
+
+    def test_sticky_after_a_write(self):
+        alias, response = self.serve(during=lambda: self.router.db_for_write(Event))
+        self.assertEqual(alias, 'default')
+        cookie = response.cookies['db_primary']
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertEqual(self.serve(cookies={'db_primary': cookie.value})[0], 'default')
+        self.assertEqual(self.serve()[0], 'replica')
+
+    def test_reads_without_a_write_set_no_cookie(self):
+        self.assertNotIn('db_primary', self.serve()[1].cookies)
+
+    def test_atomic_blocks_read_the_primary(self):
+        reads = []
+
+        def read_in_atomic():
+            with transaction.atomic():
+                reads.append(self.router.db_for_read(Event))
+
+        self.serve(during=read_in_atomic)
+        self.assertEqual(reads, ['default'])
+
+    def test_primary_reads(self):
+        reads = []
+
+        def read_primary():
+            with primary_reads():
+                reads.append(self.router.db_for_read(Event))
+            reads.append(self.router.db_for_read(Event))
+
+        self.serve(during=read_primary)
+        self.assertEqual(reads, ['default', 'replica'])
+
+
+class RequestTimingTests(TestCase):
+    """
+    The Server-Timing header is only sent when REQUEST_TIMING enables it,
+    and slow requests are logged (sampled) to config.timing.
+    """
+
+    def setUp(self):
+        # Una pàgina servida de la memòria cau no fa cap consulta
+        cache.clear()
+
+    def timing(self, **options):
+        return override_settings(REQUEST_TIMING={'server_timing': True, 'slow_request_ms': 10000, **options})
+
+    def test_server_timing_header(self):
+        with self.timing():
+            response = self.client.get('/events/')
+        parts = [part.split(';')[0] for part in response['Server-Timing'].split(', ')]
+        self.assertEqual(parts, ['db', 'tpl', 'view', 'total'])
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+    def test_no_header_when_disabled(self):
+        with self.timing(server_timing=False):
+            self.assertNotIn('Server-Timing', self.client.get('/events/'))
+
+    @override_settings(REQUEST_TIMING=None)
+    def test_no_header_without_request_timing(self):
+        self.assertNotIn('Server-Timing', self.client.get('/events/'))
+
+    def test_slow_requests_are_logged(self):
+        with self.timing(slow_request_ms=0), self.assertLogs('config.timing', 'WARNING') as logs:
+            self.client.get('/events/')
+        record = logs.records[0].timing
+        self.assertEqual((record['view'], record['status']), ('events:event_list', 200))
+        self.assertGreater(record['queries'], 0)
+
+    def test_sampling(self):
+        with self.timing(slow_request_ms=0, sample_rate=0.0), mock.patch('config.timing.logger') as logger:
+            self.client.get('/events/')
+        logger.warning.assert_not_called()
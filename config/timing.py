@@ -0,0 +1,158 @@
+"""
+Per-request timing: query count and time, template render time and view
+time, sent back in a Server-Timing header and written to the
+'config.timing' log (sampled) when a request or one of its queries is slow.
+
+Enabled with settings.REQUEST_TIMING; when it is None the middleware is
+removed from the stack at startup and the template backend only pays one
+context variable lookup per render.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'slow_request_ms': 500,
+    'slow_query_ms': 100,
+    'sample_rate': 1.0,
+    'server_timing': True,
+}
+# Consultes lentes que es guarden per petició i longitud màxima del SQL al log
+MAX_SLOW_QUERIES = 10
+SQL_LOG_LENGTH = 500
+
+_timing = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self, slow_query_ms):
+        self.slow_query_ms = slow_query_ms
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.view_start = None
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # Embolcall de connection.execute_wrapper(): no guarda els paràmetres (dades personals)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.queries += 1
+            self.db += duration
+            if duration >= self.slow_query_ms and len(self.slow_queries) < MAX_SLOW_QUERIES:
+                self.slow_queries.append({
+                    'alias': context['connection'].alias,
+                    'ms': round(duration, 2),
+                    'sql': sql[:SQL_LOG_LENGTH],
+                })
+
+
+def timing_options():
+    options = getattr(settings, 'REQUEST_TIMING', None)
+    if options is None:
+        return None
+    return {**DEFAULTS, **options}
+
+
+class TimedTemplate(DjangoTemplate):
+
+    def render(self, context=None, request=None):
+        timing = _timing.get()
+        if timing is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    DjangoTemplates backend whose templates add their render time to the
+    current request timing. Includes and extends render inside the top-level
+    template, so they are not counted twice.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class RequestTimingMiddleware:
+    """
+    Times every request that goes through Django. Must be the first
+    middleware so the total includes the others.
+    """
+
+    def __init__(self, get_response):
+        self.options = timing_options()
+        if self.options is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming(self.options['slow_query_ms'])
+        token = _timing.set(timing)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            _timing.reset(token)
+        end = time.perf_counter()
+        total = (end - start) * 1000
+        # Temps de la vista: des del process_view fins que la resposta torna aquí
+        view = (end - timing.view_start) * 1000 if timing.view_start else 0.0
+
+        if self.options['server_timing']:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timing.db:.1f};desc="{timing.queries} queries"',
+                f'tpl;dur={timing.template:.1f}',
+                f'view;dur={view:.1f}',
+                f'total;dur={total:.1f}',
+            ])
+        if (total >= self.options['slow_request_ms'] or timing.slow_queries) \
+                and random.random() < self.options['sample_rate']:
+            self.log(request, response, timing, view, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _timing.get()
+        if timing is not None:
+            timing.view_start = time.perf_counter()
+        return None
+
+    def log(self, request, response, timing, view, total):
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total, 2),
+            'view_ms': round(view, 2),
+            'db_ms': round(timing.db, 2),
+            'template_ms': round(timing.template, 2),
+            'queries': timing.queries,
+            'slow_queries': timing.slow_queries,
+        }
+        message = 'slow request' if total >= self.options['slow_request_ms'] else 'slow query'
+        logger.warning('%s %s', message, json.dumps(record), extra={'timing': record})
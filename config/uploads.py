@@ -0,0 +1,133 @@
+import warnings
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Signatures dels formats acceptats (els primers bytes del fitxer)
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+]
+HEADER_SIZE = 12
+
+
+def sniff_format(header):
+    """
+    Returns the image format announced by the first bytes of a file, or None.
+    """
+    for signature, image_format in SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+class RejectedUpload(UploadedFile):
+    """
+    Placeholder returned for an upload that was refused while streaming.
+    Its bytes were never kept; SafeImageField turns it into a form error.
+    """
+
+    def __init__(self, name, error):
+        super().__init__(file=None, name=name, size=0)
+        self.upload_error = error
+
+    def open(self, mode=None):
+        return self
+
+    def close(self):
+        pass
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every upload straight to a temporary file while enforcing
+    MAX_IMAGE_UPLOAD_SIZE and checking the image signature on the first
+    chunk. Once complete, only the image header is parsed (Pillow opens
+    lazily) to check the format and MAX_IMAGE_PIXELS, so an oversized or
+    non-image upload never gets decoded or held in memory.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.error = None
+
+    def reject(self, error):
+        self.error = error
+        self.file.close()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.MAX_IMAGE_UPLOAD_SIZE:
+            self.reject(f'La imatge no pot superar {filesizeformat(settings.MAX_IMAGE_UPLOAD_SIZE)}.')
+            return None
+        if len(self.header) < HEADER_SIZE:
+            self.header += raw_data[:HEADER_SIZE - len(self.header)]
+            if len(self.header) >= HEADER_SIZE and sniff_format(self.header) is None:
+                self.reject('El fitxer no és una imatge JPEG, PNG, GIF o WebP.')
+                return None
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.error and file_size and sniff_format(self.header) is None:
+            self.reject('El fitxer no és una imatge JPEG, PNG, GIF o WebP.')
+        if not self.error and Image is not None and file_size:
+            self.file.flush()
+            try:
+                with warnings.catch_warnings():
+                    # Comprovem nosaltres el límit de píxels amb un missatge propi
+                    warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+                    with Image.open(self.file.temporary_file_path()) as img:
+                        image_format, (width, height) = img.format, img.size
+            except Image.DecompressionBombError:
+                self.reject('La imatge té massa píxels.')
+            except Exception:
+                self.reject("No s'ha pogut llegir la capçalera de la imatge.")
+            else:
+                if width * height > settings.MAX_IMAGE_PIXELS:
+                    self.reject(f'La imatge és massa gran ({width}×{height} píxels).')
+                else:
+                    self.file.image_format = image_format
+                    self.file.content_type = Image.MIME.get(image_format, self.file.content_type)
+        if self.error:
+            return RejectedUpload(self.file_name, self.error)
+
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+
+class SafeImageField(forms.ImageField):
+    """
+    ImageField that reports the errors of ImageUploadHandler and trusts its
+    header check instead of opening the image again.
+    """
+
+    def to_python(self, data):
+        error = getattr(data, 'upload_error', None)
+        if error:
+            raise forms.ValidationError(error, code='invalid_image')
+        if getattr(data, 'image_format', None):
+            return forms.FileField.to_python(self, data)
+        return super().to_python(data)
+
+
+if Image is not None:
+    # Defensa addicional per a qualsevol altre codi que obri imatges
+    Image.MAX_IMAGE_PIXELS = getattr(settings, 'MAX_IMAGE_PIXELS', Image.MAX_IMAGE_PIXELS)
@@ -14,9 +14,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from . import views
 
 urlpatterns = [
@@ -24,8 +25,11 @@ urlpatterns = [
     path('users/', include('users.urls', namespace='users')), # MOD: Inclou URLs de l'aplicació users 
     path('', views.home, name='home'),
     path('events/', include('events.urls', namespace='events')), # MOD: Inclou URLs de l'aplicació events
+    path('metrics', views.metrics, name='metrics'), # MOD: Mètriques en format Prometheus
 ]
 
-# Servir fitxers media durant el desenvolupament
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Servir fitxers media durant el desenvolupament (o si SERVE_MEDIA està activat)
+if settings.DEBUG or getattr(settings, 'SERVE_MEDIA', False):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), views.media, name='media'),
+    ]
\ No newline at end of file
@@ -1,4 +1,49 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.shortcuts import render
+from django.views.static import serve
+
+from events.featured import get_featured_events
+from events.feed import get_feed
+
+from .metrics import CONTENT_TYPE, REGISTRY
+from .storage import content_etag
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
 
 def home(request):
-    return render(request, 'index.html')
\ No newline at end of file
+    return render(request, 'index.html', {
+        'featured_events': get_featured_events(),
+        'feed_events': get_feed(request.user) if request.user.is_authenticated else None,
+    })
+
+def media(request, path):
+    """
+    Serves uploaded files. Content-addressed files never change, so they are
+    sent with an ETag and a one-year immutable Cache-Control.
+    """
+    etag = content_etag(path)
+    if etag and etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if etag:
+        response['ETag'] = etag
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint. Only answers requests with the
+    "Authorization: Bearer <METRICS_TOKEN>" header; without METRICS_TOKEN
+    it does not exist.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not getattr(settings, 'METRICS_ENABLED', False) or not token:
+        raise Http404
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+        raise Http404
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
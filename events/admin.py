@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Event
+from django.db import models
+from config.uploads import SafeImageField
+from .models import Event, Tag
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
@@ -7,3 +9,13 @@ class EventAdmin(admin.ModelAdmin):
     list_filter = ('status', 'category', 'is_featured', 'scheduled_date')
     search_fields = ('title', 'description', 'creator__username')
     ordering = ('-scheduled_date',)
+    # Les etiquetes normalitzades es deriven d'Event.tags (events.tags.sync_event_tags)
+    exclude = ('normalized_tags',)
+    # Mostra els errors d'ImageUploadHandler (mida, format) en lloc de "fitxer buit"
+    formfield_overrides = {models.ImageField: {'form_class': SafeImageField}}
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'event_count')
+    search_fields = ('name',)
+    readonly_fields = ('event_count',)
@@ -0,0 +1,225 @@
+import hashlib
+import json
+
+from django.core.files.storage import default_storage
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
+from django.views.decorators.http import require_GET
+
+from .forms import EventSearchForm
+from .models import Event
+from .pagination import CursorPaginator
+from .querybudget import query_budget
+
+API_PER_PAGE = 50
+API_MAX_PER_PAGE = 200
+EXPORT_CHUNK_SIZE = 2000
+
+# nom a l'API: columna que es llegeix amb values()
+FIELDS = {
+    'id': 'id',
+    'url': 'id',
+    'title': 'title',
+    'description': 'description',
+    'category': 'category',
+    'status': 'status',
+    'scheduled_date': 'scheduled_date',
+    'ends_at': 'ends_at',
+    'duration': 'duration',
+    'max_viewers': 'max_viewers',
+    'is_featured': 'is_featured',
+    'tags': 'tags',
+    'thumbnail': 'thumbnail',
+    'stream_url': 'stream_url',
+    'stream_provider': 'stream_provider',
+    'stream_embed_url': 'stream_embed_url',
+    'creator': 'creator__username',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+CONVERTERS = {
+    'url': lambda pk: reverse('events:event_detail', kwargs={'pk': pk}),
+    'tags': lambda tags: [tag.strip() for tag in tags.split(',') if tag.strip()],
+    'thumbnail': lambda name: default_storage.url(name) if name else None,
+}
+# Sempre es llegeixen: cursor, ETag i Last-Modified
+KEY_COLUMNS = ('id', 'created_at', 'updated_at')
+
+
+class InvalidQuery(Exception):
+    pass
+
+
+def parse_fields(request):
+    """
+    Returns the API fields requested with ?fields=a,b (all of them by default).
+    """
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(FIELDS)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def columns_for(fields):
+    return list(dict.fromkeys([*KEY_COLUMNS, *(FIELDS[name] for name in fields)]))
+
+
+def serialize(row, fields):
+    return {
+        name: CONVERTERS[name](row[FIELDS[name]]) if name in CONVERTERS else row[FIELDS[name]]
+        for name in fields
+    }
+
+
+def filtered_events(request):
+    """
+    Returns (queryset, ranked) filtered like the HTML list (EventSearchForm).
+    """
+    form = EventSearchForm(request.GET)
+    if not form.is_valid():
+        raise InvalidQuery(form.errors.get_json_data())
+    events = form.filter_events(Event.objects.all())
+    return events, bool(form.cleaned_data.get('search'))
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', API_PER_PAGE))
+    except ValueError:
+        raise InvalidQuery('limit must be an integer')
+    return max(1, min(limit, API_MAX_PER_PAGE))
+
+
+def page_url(request, **params):
+    query = [
+        (key, value) for key, value in request.GET.items()
+        if value and key not in ('page', 'after', 'before')
+    ]
+    query.extend(params.items())
+    return f'{request.path}?{urlencode(sorted(query))}'
+
+
+def validators(rows, *extra):
+    """
+    Returns (ETag, Last-Modified timestamp) of a list of rows. The ETag
+    covers the ids and updated_at of every row, so edits, insertions and
+    deletions inside the page all change it, and the `extra` values (the
+    projected fields and the page links).
+    """
+    digest = hashlib.md5()
+    for row in rows:
+        digest.update(f"{row['id']}:{row['updated_at'].isoformat()};".encode())
+    for value in extra:
+        digest.update(f'{value};'.encode())
+    last_modified = max((row['updated_at'] for row in rows), default=None)
+    return f'"{digest.hexdigest()}"', int(last_modified.timestamp()) if last_modified else None
+
+
+def conditional_json(request, data_fn, etag, last_modified):
+    """
+    Answers 304 when the client copy is still valid; otherwise builds the
+    JSON body (only then) and adds the validators.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(data_fn(), encoder=DjangoJSONEncoder, json_dumps_params={'ensure_ascii': False})
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, max_age=0, must_revalidate=True)
+    return response
+
+
+def bad_request(error):
+    return JsonResponse({'error': error.args[0]}, status=400)
+
+
+def not_found(message):
+    return JsonResponse({'error': message}, status=404)
+
+
+@require_GET
+@query_budget(3)
+def event_list_api(request):
+    try:
+        fields = parse_fields(request)
+        events, ranked = filtered_events(request)
+        per_page = page_size(request)
+    except InvalidQuery as error:
+        return bad_request(error)
+
+    events = events.values(*columns_for(fields))
+    if ranked:
+        # Ordenat per rellevància: paginació numerada com a la vista HTML
+        try:
+            page = Paginator(events, per_page).page(request.GET.get('page', 1))
+        except (EmptyPage, PageNotAnInteger) as error:
+            return not_found(str(error))
+        rows = list(page)
+        next_url = page_url(request, page=page.next_page_number()) if page.has_next() else None
+        previous_url = page_url(request, page=page.previous_page_number()) if page.has_previous() else None
+    else:
+        page = CursorPaginator(events, per_page).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        rows = page.object_list
+        next_url = page_url(request, after=page.next_cursor) if page.has_next() else None
+        previous_url = page_url(request, before=page.previous_cursor) if page.has_previous() else None
+
+    etag, last_modified = validators(rows, ','.join(fields), next_url, previous_url)
+    return conditional_json(request, lambda: {
+        'results': [serialize(row, fields) for row in rows],
+        'next': next_url,
+        'previous': previous_url,
+    }, etag, last_modified)
+
+
+@require_GET
+@query_budget(1)
+def event_detail_api(request, pk):
+    try:
+        fields = parse_fields(request)
+    except InvalidQuery as error:
+        return bad_request(error)
+    row = Event.objects.filter(pk=pk).values(*columns_for(fields)).first()
+    if row is None:
+        return not_found('Event not found.')
+    etag, last_modified = validators([row], ','.join(fields))
+    return conditional_json(request, lambda: serialize(row, fields), etag, last_modified)
+
+
+@require_GET
+def event_export_api(request):
+    """
+    Streams every matching event as one JSON object per line, reading the
+    rows through a server-side cursor so memory stays constant.
+    """
+    try:
+        fields = parse_fields(request)
+        events, ranked = filtered_events(request)
+    except InvalidQuery as error:
+        return bad_request(error)
+    if not ranked:
+        events = events.order_by('-created_at', '-pk')
+    # El cursor es llegeix mentre s'envia la resposta, quan l'encaminament de la
+    # petició (config.routers) ja s'ha tancat: fixem l'àlies ara
+    events = events.using(router.db_for_read(Event))
+    rows = events.values(*columns_for(fields)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    def lines():
+        for row in rows:
+            yield json.dumps(serialize(row, fields), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    response = StreamingHttpResponse(lines(), content_type='application/x-ndjson; charset=utf-8')
+    response.headers['Content-Disposition'] = 'attachment; filename="events.ndjson"'
+    return response
@@ -0,0 +1,214 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from config.routers import primary_reads
+
+VERSION_PREFIX = 'events:version:'
+LOCK_TIMEOUT = 30  # Temps màxim que un procés pot tenir el bloqueig de recàlcul
+STALE_GRACE = 600  # Segons que un valor caducat es pot continuar servint
+LOCK_WAIT = 2  # Temps màxim que s'espera un valor que calcula un altre procés
+WAIT_INTERVAL = 0.05
+
+_stats = {'hit': 0, 'miss': 0, 'stale': 0, 'early_refresh': 0, 'wait': 0}
+_stats_lock = threading.Lock()
+
+
+def _initial_version():
+    # Si la clau de versió es perd (expulsió de la memòria cau) no tornem
+    # mai a un número antic que pugui coincidir amb entrades obsoletes.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """
+    Returns the current version counter of a cached namespace.
+    """
+    key = VERSION_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*names):
+    """
+    Invalidates every entry of the given namespaces by moving their version.
+    """
+    for name in names:
+        key = VERSION_PREFIX + name
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def get_versions(names):
+    """
+    Returns the version counters of several namespaces in one cache round trip.
+    """
+    keys = [VERSION_PREFIX + name for name in names]
+    found = cache.get_many(keys)
+    versions = []
+    for name, key in zip(names, keys):
+        version = found.get(key)
+        if version is None:
+            version = get_version(name)
+        versions.append(version)
+    return versions
+
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """
+    Returns the counters of get_or_compute() for this process.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_or_compute(key, compute, timeout, version=None, beta=1.0):
+    """
+    Returns the cached value of `key`, recomputing it with `compute()` when
+    needed, with stampede protection:
+
+    - only the worker that takes the lock recomputes; the others keep
+      serving the previous value (stale-while-revalidate) or, if there is
+      none yet, wait up to LOCK_WAIT seconds for the result and then
+      compute it themselves;
+    - an entry is refreshed a bit before it expires with a probability that
+      grows as expiry approaches (XFetch, scaled by the recompute time and
+      `beta`), so hot keys rarely expire at all;
+    - a different `version` marks the entry as stale, so invalidated
+      entries are also rebuilt by a single worker.
+
+    If `compute()` returns None the result is not stored.
+    """
+    lock_key = key + ':lock'
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None:
+        value, expires_at, delta, entry_version = entry
+        fresh = entry_version == version and now < expires_at
+        if fresh and now - delta * beta * math.log(1.0 - random.random()) < expires_at:
+            _count('hit')
+            return value
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            _count('hit' if fresh else 'stale')
+            return value
+        _count('early_refresh' if fresh else 'stale')
+        return _recompute(key, lock_key, compute, timeout, version)
+
+    _count('miss')
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        return _recompute(key, lock_key, compute, timeout, version)
+
+    # Un altre procés ja ho està calculant: l'esperem una estona, no tot el LOCK_TIMEOUT
+    _count('wait')
+    deadline = now + LOCK_WAIT
+    while time.time() < deadline and cache.get(lock_key) is not None:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    with primary_reads():
+        return compute()
+
+
+def _recompute(key, lock_key, compute, timeout, version):
+    try:
+        start = time.time()
+        # El valor es guarda amb la versió nova: no es pot llegir d'una rèplica endarrerida
+        with primary_reads():
+            value = compute()
+        delta = time.time() - start
+        if value is not None:
+            cache.set(key, (value, time.time() + timeout, delta, version), timeout + STALE_GRACE)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+def invalidate_event(event, old_category=None):
+    """
+    Invalidates the cached pages that can show this event: the event detail,
+    the general list and the pages of its current (and previous) category.
+    """
+    names = ['list', f'event:{event.pk}', f'category:{event.category}']
+    if old_category and old_category != event.category:
+        names.append(f'category:{old_category}')
+    bump_version(*names)
+
+
+def _is_cacheable(request, allowed_params):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if any(key not in allowed_params for key in request.GET):
+        return False
+    # Els missatges pendents i l'usuari autenticat fan la pàgina personal
+    if 'messages' in request.COOKIES:
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and request.session.get('_messages'):
+        return False
+    return not request.user.is_authenticated
+
+
+def page_cache_key(request):
+    params = sorted((key, value) for key, value in request.GET.items() if value)
+    raw = f'{request.path}?{urlencode(params)}'
+    return 'events:page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def versioned_page_cache(scopes, params=()):
+    """
+    Caches the full response of a public view for anonymous users.
+
+    `scopes(request, *args, **kwargs)` returns the version namespaces the
+    page depends on (e.g. ['list', 'featured']); bumping any of them marks
+    every cached variant of the page as stale, and it is then rebuilt by a
+    single worker through get_or_compute(). Only the query parameters
+    in `params` are accepted, so arbitrary parameters cannot fill the cache.
+    Authenticated users always get a fresh, personalised render.
+    """
+    allowed_params = frozenset(params)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = getattr(settings, 'EVENTS_PAGE_CACHE_TIMEOUT', 300)
+            if not timeout or not _is_cacheable(request, allowed_params):
+                return view(request, *args, **kwargs)
+
+            names = scopes(request, *args, **kwargs)
+            rendered = {}
+
+            def render():
+                response = rendered['response'] = view(request, *args, **kwargs)
+                if (response.status_code == 200 and not response.streaming
+                        and not response.cookies and not request.META.get('CSRF_COOKIE_USED')):
+                    return response.content, response['Content-Type']
+                return None
+
+            cached = get_or_compute(
+                page_cache_key(request), render, timeout, version=tuple(get_versions(names)),
+            )
+            if 'response' in rendered:
+                return rendered['response']
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        return wrapper
+    return decorator
@@ -0,0 +1,28 @@
+from .caching import bump_version, get_or_compute, get_version
+from .models import Event
+
+FEATURED_LIMIT = 6
+FEATURED_TIMEOUT = 600
+
+
+def get_featured_events(category=None, limit=FEATURED_LIMIT):
+    """
+    Returns the newest featured events (optionally of one category).
+    The top-N query runs on the (is_featured, category, -created_at) indexes
+    and its result stays cached until a featured event changes; a single
+    worker rebuilds it while the others keep serving the previous list.
+    """
+    def compute():
+        queryset = Event.objects.for_cards().filter(is_featured=True)
+        if category:
+            queryset = queryset.filter(category=category)
+        return list(queryset.order_by('-created_at', '-pk')[:limit])
+
+    return get_or_compute(
+        f'events:featured:{category or "all"}:{limit}', compute, FEATURED_TIMEOUT,
+        version=get_version('featured'),
+    )
+
+
+def invalidate_featured():
+    bump_version('featured')
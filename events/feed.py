@@ -0,0 +1,146 @@
+from django.conf import settings
+
+from users.models import CustomUser, Follow
+
+from .caching import get_or_compute
+from .models import Event, EventQuerySet, TimelineEntry
+
+FEED_LIMIT = 12
+ACTIVE_STATUSES = ('scheduled', 'live')
+FANOUT_BATCH_SIZE = 1000
+POPULAR_TIMEOUT = 600
+
+
+def fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+
+
+def popular_creators():
+    """
+    Ids of the creators with more followers than FEED_FANOUT_LIMIT. Their
+    events are not copied into every follower timeline: readers fetch them
+    at read time instead (fan-in).
+    """
+    def compute():
+        return set(
+            CustomUser.objects.filter(followers_count__gt=fanout_limit()).values_list('pk', flat=True)
+        )
+
+    return get_or_compute('events:feed:popular', compute, POPULAR_TIMEOUT)
+
+
+def _insert_entries(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True)
+
+
+def sync_event_timelines(pk):
+    """
+    Brings the timelines of the creator's followers in line with the event:
+    active events are copied to every follower (or their date updated) and
+    finished, cancelled or deleted ones are removed.
+    """
+    event = Event.objects.filter(pk=pk).values('creator_id', 'status', 'scheduled_date').first()
+    if event is None or event['status'] not in ACTIVE_STATUSES or event['creator_id'] in popular_creators():
+        TimelineEntry.objects.filter(event_id=pk).delete()
+        return
+
+    TimelineEntry.objects.filter(event_id=pk).exclude(
+        scheduled_date=event['scheduled_date'],
+    ).update(scheduled_date=event['scheduled_date'])
+
+    followers = Follow.objects.filter(following_id=event['creator_id']).values_list('follower_id', flat=True)
+    pending = []
+    for follower_id in followers.iterator(chunk_size=FANOUT_BATCH_SIZE):
+        pending.append(TimelineEntry(
+            user_id=follower_id, event_id=pk, creator_id=event['creator_id'],
+            scheduled_date=event['scheduled_date'],
+        ))
+        if len(pending) == FANOUT_BATCH_SIZE:
+            _insert_entries(pending)
+            pending = []
+    _insert_entries(pending)
+
+
+def remove_from_timelines(pks):
+    TimelineEntry.objects.filter(event_id__in=pks).delete()
+
+
+def follow_creator(follower_id, creator_id):
+    """
+    Copies the active events of a newly followed creator into the timeline.
+    """
+    if creator_id in popular_creators():
+        return
+    events = Event.objects.filter(creator_id=creator_id, status__in=ACTIVE_STATUSES)
+    _insert_entries([
+        TimelineEntry(user_id=follower_id, event_id=pk, creator_id=creator_id, scheduled_date=scheduled_date)
+        for pk, scheduled_date in events.values_list('pk', 'scheduled_date')
+    ])
+
+
+def unfollow_creator(follower_id, creator_id):
+    TimelineEntry.objects.filter(user_id=follower_id, creator_id=creator_id).delete()
+
+
+def get_feed(user, limit=FEED_LIMIT):
+    """
+    Returns the next `limit` live or upcoming events of the creators `user`
+    follows, soonest first. The timeline is one range read on the
+    (user, scheduled_date) index however many creators are followed; the
+    events of popular creators are merged in with a second bounded query.
+    """
+    card_fields = [f'event__{name}' for name in EventQuerySet.CARD_FIELDS]
+    entries = (
+        TimelineEntry.objects.filter(user=user)
+        .select_related('event__creator')
+        .only('event', *card_fields, 'event__creator__username')
+        .order_by('scheduled_date', 'event_id')[:limit]
+    )
+    events = [entry.event for entry in entries]
+
+    popular = popular_creators()
+    if popular:
+        fan_in = list(
+            Event.objects.for_cards()
+            .filter(creator_id__in=popular, creator__followers_set__follower=user, status__in=ACTIVE_STATUSES)
+            .order_by('scheduled_date', 'pk')[:limit]
+        )
+        if fan_in:
+            seen = {event.pk for event in events}
+            events.extend(event for event in fan_in if event.pk not in seen)
+            events.sort(key=lambda event: (event.scheduled_date, event.pk))
+            events = events[:limit]
+    return events
+
+
+def rebuild_timelines(batch_size=FANOUT_BATCH_SIZE, stdout=None):
+    """
+    Rebuilds every timeline from Follow and the active events, for data
+    written without signals (bulk loads). Returns the number of entries.
+    """
+    TimelineEntry.objects.all().delete()
+    popular = popular_creators()
+
+    active = {}
+    events = Event.objects.filter(status__in=ACTIVE_STATUSES).exclude(creator_id__in=popular)
+    for pk, creator_id, scheduled_date in events.values_list('pk', 'creator_id', 'scheduled_date').iterator():
+        active.setdefault(creator_id, []).append((pk, scheduled_date))
+
+    created = 0
+    pending = []
+    follows = Follow.objects.values_list('follower_id', 'following_id')
+    for follower_id, creator_id in follows.iterator(chunk_size=batch_size):
+        if creator_id not in active:
+            continue
+        pending.extend(
+            TimelineEntry(user_id=follower_id, event_id=pk, creator_id=creator_id, scheduled_date=scheduled_date)
+            for pk, scheduled_date in active[creator_id]
+        )
+        if len(pending) >= batch_size:
+            _insert_entries(pending)
+            created += len(pending)
+            pending = []
+            if stdout:
+                stdout.write(f'  {created} timeline entries written...')
+    _insert_entries(pending)
+    return created + len(pending)
@@ -1,11 +1,35 @@
+from datetime import timedelta
+
 from django import forms
 from django.utils import timezone
+from config.uploads import SafeImageField
 from .models import Event
+from .search import search_events
+from .tags import normalize_tag
+
+DEFAULT_DURATION = timedelta(hours=1)
+DUPLICATE_TITLE_ERROR = "Ja tens un esdeveniment amb aquest títol."
+
+
+def title_taken(creator, title, exclude_pk=None):
+    # La restricció única (creator, title) de la BD només és la segona defensa
+    events = Event.objects.filter(creator=creator, title=title)
+    if exclude_pk:
+        events = events.exclude(pk=exclude_pk)
+    return events.exists()
+
+
+def validate_duration(duration):
+    if duration is not None and duration <= timedelta(0):
+        raise forms.ValidationError("La durada ha de ser positiva.")
+    return duration
+
 
 class EventCreationForm(forms.ModelForm):
     class Meta:
         model = Event
-        fields = ['title', 'description', 'category', 'scheduled_date', 'thumbnail', 'max_viewers', 'tags', 'stream_url']
+        fields = ['title', 'description', 'category', 'scheduled_date', 'duration', 'thumbnail', 'max_viewers', 'tags', 'stream_url']
+        field_classes = {'thumbnail': SafeImageField}
         widgets = {
             'scheduled_date': forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}, format='%Y-%m-%dT%H:%M'),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
@@ -15,11 +39,14 @@ class EventCreationForm(forms.ModelForm):
             'max_viewers': forms.NumberInput(attrs={'class': 'form-control'}),
             'tags': forms.TextInput(attrs={'class': 'form-control'}),
             'stream_url': forms.URLInput(attrs={'class': 'form-control'}),
+            'duration': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'HH:MM:SS'}),
         }
 
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
+        # Amb una durada, el planificador passa l'esdeveniment de directe a finalitzat
+        self.fields['duration'].initial = DEFAULT_DURATION
 
     def clean_scheduled_date(self):
         scheduled_date = self.cleaned_data.get('scheduled_date')
@@ -29,8 +56,8 @@ class EventCreationForm(forms.ModelForm):
 
     def clean_title(self):
         title = self.cleaned_data.get('title')
-        if self.user and Event.objects.filter(creator=self.user, title=title).exists():
-            raise forms.ValidationError("Ja tens un esdeveniment amb aquest títol.")
+        if self.user and title and title_taken(self.user, title):
+            raise forms.ValidationError(DUPLICATE_TITLE_ERROR)
         return title
 
     def clean_max_viewers(self):
@@ -39,10 +66,14 @@ class EventCreationForm(forms.ModelForm):
             raise forms.ValidationError("El màxim d'espectadors ha d'estar entre 1 i 1000.")
         return max_viewers
 
+    def clean_duration(self):
+        return validate_duration(self.cleaned_data.get('duration'))
+
 class EventUpdateForm(forms.ModelForm):
     class Meta:
         model = Event
         fields = ['title', 'description', 'category', 'scheduled_date', 'thumbnail', 'max_viewers', 'tags', 'status', 'stream_url', 'duration']
+        field_classes = {'thumbnail': SafeImageField}
         widgets = {
             'scheduled_date': forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}, format='%Y-%m-%dT%H:%M'),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
@@ -73,6 +104,16 @@ class EventUpdateForm(forms.ModelForm):
                  raise forms.ValidationError("Només el creador pot canviar l'estat.")
         return status
 
+    def clean_title(self):
+        title = self.cleaned_data.get('title')
+        if self.instance.pk and title and title_taken(self.instance.creator_id, title, exclude_pk=self.instance.pk):
+            raise forms.ValidationError(DUPLICATE_TITLE_ERROR)
+        return title
+
+    def clean_duration(self):
+        # Durada prevista (programat o en directe) o real (finalitzat)
+        return validate_duration(self.cleaned_data.get('duration'))
+
     def clean_scheduled_date(self):
         scheduled_date = self.cleaned_data.get('scheduled_date')
         # Removed strict check for live events here to allow finish+date change
@@ -81,7 +122,6 @@ class EventUpdateForm(forms.ModelForm):
     def clean(self):
         cleaned_data = super().clean()
         status = cleaned_data.get('status')
-        duration = cleaned_data.get('duration')
         scheduled_date = cleaned_data.get('scheduled_date')
 
         # Logic moved from clean_scheduled_date:
@@ -90,12 +130,30 @@ class EventUpdateForm(forms.ModelForm):
              if scheduled_date and scheduled_date != self.instance.scheduled_date:
                 self.add_error('scheduled_date', "No es pot canviar la data si l'esdeveniment continua en directe.")
 
-        if duration and status != 'finished':
-            self.add_error('duration', "La duració només es pot establir si l'esdeveniment ha finalitzat.")
-        
         return cleaned_data
 
 class EventSearchForm(forms.Form):
     search = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Cercar...'}))
     category = forms.ChoiceField(choices=[('', 'Totes')] + Event.CATEGORY_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-select'}))
     status = forms.ChoiceField(choices=[('', 'Tots')] + Event.STATUS_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-select'}))
+    tag = forms.CharField(required=False, widget=forms.HiddenInput())
+
+    def filter_events(self, events):
+        """
+        Applies the cleaned filters to an event queryset (the form must be
+        valid). A search ranks the results by relevance.
+        """
+        category = self.cleaned_data.get('category')
+        status = self.cleaned_data.get('status')
+        tag = normalize_tag(self.cleaned_data.get('tag'))
+        search = self.cleaned_data.get('search')
+
+        if category:
+            events = events.filter(category=category)
+        if status:
+            events = events.filter(status=status)
+        if tag:
+            events = events.filter(normalized_tags__name=tag)
+        if search:
+            events = search_events(events, search)
+        return events
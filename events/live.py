@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 16
+HEARTBEAT_INTERVAL = 15
+RETRY_MS = 5000
+# Missatges que el CacheBackend guarda per canal (els subscriptors lents en perden)
+CACHE_LOG_SIZE = 50
+CACHE_MESSAGE_TIMEOUT = 300
+
+LIVE_PATH = re.compile(r'^/events/live/(?:event/(?P<pk>\d+)|category/(?P<category>[a-z]+))/$')
+
+
+def event_channel(pk):
+    return f'event:{pk}'
+
+
+def category_channel(category):
+    return f'category:{category}'
+
+
+class Subscription:
+    """
+    Bounded queue of one connection. When the consumer is too slow and the
+    queue is full, the oldest message is dropped: only the latest statuses
+    matter, and a slow client never makes the publisher wait or grow memory.
+    """
+
+    def __init__(self, channels, loop, maxsize=QUEUE_SIZE):
+        self.channels = channels
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def deliver(self, message):
+        # S'executa al fil del bucle d'esdeveniments (call_soon_threadsafe)
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LocalBackend:
+    """
+    In-process pub/sub: publish() fans the message out to the subscriptions
+    of this process only. Enough for tests and single-process servers where
+    the publishers (views, scheduler thread) live with the connections.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channels, loop):
+        subscription = Subscription(channels, loop)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def channels(self):
+        with self._lock:
+            return list(self._subscriptions)
+
+    def fan_out(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # El bucle ja s'ha tancat: la connexió està morint
+                self.unsubscribe(subscription)
+
+    def publish(self, channel, message):
+        self.fan_out(channel, message)
+
+
+class CacheBackend(LocalBackend):
+    """
+    Cross-process pub/sub over the shared cache: publish() appends to a
+    per-channel log (a counter plus one key per message) and a single poller
+    per server process reads the channels it has subscribers for, then fans
+    out locally. The cost is one cache round trip per poll, not per client.
+    """
+
+    def __init__(self, poll_interval=1.0):
+        super().__init__()
+        self.poll_interval = poll_interval
+        self._last_seen = {}
+        self._poller = None
+
+    def publish(self, channel, message):
+        key = f'live:seq:{channel}'
+        cache.add(key, 0, None)
+        seq = cache.incr(key)
+        cache.set(f'live:msg:{channel}:{seq}', message, CACHE_MESSAGE_TIMEOUT)
+
+    def subscribe(self, channels, loop):
+        subscription = super().subscribe(channels, loop)
+        if self._poller is None or self._poller.done():
+            self._poller = loop.create_task(self.poll())
+        return subscription
+
+    def read(self):
+        channels = self.channels()
+        if not channels:
+            return []
+        sequences = cache.get_many([f'live:seq:{channel}' for channel in channels])
+        keys = []
+        for channel in channels:
+            seq = sequences.get(f'live:seq:{channel}', 0)
+            last = self._last_seen.setdefault(channel, seq)
+            first = max(last + 1, seq - CACHE_LOG_SIZE + 1)
+            keys.extend(f'live:msg:{channel}:{n}' for n in range(first, seq + 1))
+            self._last_seen[channel] = seq
+        for channel in list(self._last_seen):
+            if channel not in channels:
+                del self._last_seen[channel]
+        messages = cache.get_many(keys)
+        return [
+            (key.split(':', 2)[2].rsplit(':', 1)[0], messages[key]) for key in keys if key in messages
+        ]
+
+    async def poll(self):
+        loop = asyncio.get_running_loop()
+        while self.channels():
+            try:
+                for channel, message in await loop.run_in_executor(None, self.read):
+                    self.fan_out(channel, message)
+            except Exception:
+                logger.exception('Could not poll the live status channels')
+            await asyncio.sleep(self.poll_interval)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend = getattr(settings, 'LIVE_BACKEND', 'events.live.LocalBackend')
+            _backend = import_string(backend)(**getattr(settings, 'LIVE_BACKEND_OPTIONS', {}))
+        return _backend
+
+
+def publish_status(pk, category, old, new):
+    """
+    Announces a status change to the viewers of the event and of its category.
+    """
+    message = {'id': pk, 'category': category, 'old': old, 'status': new}
+    backend = get_backend()
+    try:
+        backend.publish(event_channel(pk), message)
+        backend.publish(category_channel(category), message)
+    except Exception:
+        # Els avisos en directe mai han de fer fallar un desament
+        logger.exception('Could not publish the status change of event %s', pk)
+
+
+def current_status(pk):
+    from .models import Event
+
+    return Event.objects.filter(pk=pk).values_list('status', 'category').first()
+
+
+def sse_event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+async def live_status_app(scope, receive, send):
+    """
+    Raw ASGI app that streams status changes as Server-Sent Events:
+    /events/live/event/<pk>/ or /events/live/category/<category>/.
+    Each connection is just a small queue and a coroutine, so one process
+    holds thousands of them.
+    """
+    from asgiref.sync import sync_to_async
+
+    from .models import Event
+
+    match = LIVE_PATH.match(scope['path'])
+    if match['category'] and match['category'] not in dict(Event.CATEGORY_CHOICES):
+        await send_not_found(send)
+        return
+
+    initial = None
+    if match['pk']:
+        initial = await sync_to_async(current_status)(int(match['pk']))
+        if initial is None:
+            await send_not_found(send)
+            return
+        channels = [event_channel(match['pk'])]
+    else:
+        channels = [category_channel(match['category'])]
+
+    backend = get_backend()
+    subscription = backend.subscribe(channels, asyncio.get_running_loop())
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        body = f'retry: {RETRY_MS}\n\n'.encode()
+        if initial:
+            body += sse_event('status', {'id': int(match['pk']), 'status': initial[0], 'category': initial[1]})
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+        while not disconnected.is_set():
+            getter = asyncio.ensure_future(subscription.get(HEARTBEAT_INTERVAL))
+            await asyncio.wait([getter, watcher], return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break
+            try:
+                body = sse_event('status', getter.result())
+            except asyncio.TimeoutError:
+                body = b': ping\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except OSError:
+        pass
+    finally:
+        watcher.cancel()
+        backend.unsubscribe(subscription)
+
+
+async def send_not_found(send):
+    await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': b'Not found'})
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from events.providers import backfill_stream_embeds
+
+class Command(BaseCommand):
+    help = 'Recomputes the stream provider, reference and embed URL stored on every event.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of events processed per batch'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Backfilling stream embeds...')
+        processed, changed = backfill_stream_embeds(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Successfully processed {processed} events ({changed} updated).'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from events.tags import backfill_tags
+
+class Command(BaseCommand):
+    help = 'Rebuilds the normalized tags and tag counts of every event.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of events processed per batch'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Backfilling tags...')
+        events, tags = backfill_tags(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Successfully processed {events} events ({tags} distinct tags).'))
@@ -0,0 +1,268 @@
+import io
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from events.models import Event
+
+BENCH_PASSWORD = 'password123'
+REFERENCE_DATE = '2025-01-15'
+DEEP_PAGE = 50
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Measures latency percentiles and query counts of the main views and compares them with a baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=2000,
+            help='Users in the benchmark dataset'
+        )
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=20000,
+            help='Events in the benchmark dataset'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=30,
+            help='Measured requests per scenario'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help='Unmeasured requests per scenario'
+        )
+        parser.add_argument(
+            '--baseline',
+            default='benchmarks/baseline.json',
+            help='Baseline file the results are compared with'
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmarks/latest.json',
+            help='File where the results of this run are written'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            default=False,
+            help='Store this run as the new baseline instead of comparing'
+        )
+        parser.add_argument(
+            '--require-baseline',
+            action='store_true',
+            default=False,
+            help='Fail when the baseline file does not exist (for CI)'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.25,
+            help='Allowed p95 latency ratio over the baseline'
+        )
+        parser.add_argument(
+            '--slack-ms',
+            type=float,
+            default=2.0,
+            help='Absolute p95 slack in milliseconds (noise on very fast views)'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='*',
+            default=None,
+            help='Run only these scenarios'
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK_DATABASE', False):
+            raise CommandError(
+                'benchmark_views rebuilds its database: run it with DJANGO_SETTINGS_MODULE=config.settings_bench.'
+            )
+        # Com el runner de tests: permet llegir response.context i desactiva l'enviament de correu
+        setup_test_environment()
+
+        dataset = self.prepare_dataset(options['users'], options['events'])
+        scenarios = self.build_scenarios()
+        if options['only']:
+            unknown = set(options['only']) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = {name: scenarios[name] for name in options['only']}
+
+        results = {}
+        self.stdout.write(f"{'scenario':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for name, (make_request, expected_status) in scenarios.items():
+            results[name] = self.measure(name, make_request, expected_status, options['iterations'], options['warmup'])
+            result = results[name]
+            self.stdout.write(
+                f"{name:<24}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['queries']:>9}"
+            )
+
+        report = {
+            'meta': {
+                'dataset': dataset,
+                'iterations': options['iterations'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'results': results,
+        }
+        self.write_json(options['output'], report)
+
+        if options['save_baseline']:
+            self.write_json(options['baseline'], report)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}."))
+            return
+
+        baseline_path = Path(options['baseline'])
+        if not baseline_path.exists():
+            if options['require_baseline']:
+                raise CommandError(f'No baseline at {baseline_path}: run with --save-baseline first.')
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}: run with --save-baseline first.'))
+            return
+        baseline = json.loads(baseline_path.read_text())
+        failures = self.compare(baseline, report, options['tolerance'], options['slack_ms'])
+        if failures:
+            for failure in failures:
+                self.stdout.write(self.style.ERROR(f'  {failure}'))
+            raise CommandError(f'{len(failures)} performance regressions against {baseline_path}.')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def prepare_dataset(self, users, events):
+        """
+        Migrates the benchmark database and seeds it (reproducibly) unless it
+        already holds a dataset of the requested size.
+        """
+        call_command('migrate', verbosity=0, interactive=False)
+        User = get_user_model()
+        if User.objects.filter(is_superuser=False).count() != users or Event.objects.count() != events:
+            self.stdout.write(f'Seeding {users} users and {events} events...')
+            call_command(
+                'seed_users', users=users, clear=True, with_follows=True, seed=1,
+                password=BENCH_PASSWORD, batch_size=5000, stdout=io.StringIO(),
+            )
+            call_command(
+                'seed_events', events=events, clear=True, seed=1, reference_date=REFERENCE_DATE,
+                batch_size=5000, stdout=io.StringIO(),
+            )
+        return {'users': users, 'events': events, 'reference_date': REFERENCE_DATE}
+
+    def build_scenarios(self):
+        """
+        Returns {name: (make_request, expected status)}. Anonymous requests
+        use a fresh client each time; logged-in scenarios log in once, so
+        the login itself is not part of their timings.
+        """
+        User = get_user_model()
+        creator = (
+            User.objects.annotate(events=Count('event')).order_by('-events', 'pk').first()
+        )
+        event = Event.objects.order_by('pk').first()
+        deep_cursor = self.deep_cursor(DEEP_PAGE)
+
+        def anonymous(path):
+            return lambda: Client().get(path)
+
+        def logged_in(path):
+            client = Client()
+            client.force_login(creator)
+            return lambda: client.get(path)
+
+        def login(username, password):
+            return lambda: Client().post('/users/login/', {'username': username, 'password': password})
+
+        return {
+            'event_list': (anonymous('/events/'), 200),
+            'event_list_search': (anonymous('/events/?search=minecraft'), 200),
+            'event_list_filtered': (anonymous('/events/?category=gaming&status=finished'), 200),
+            'event_list_deep_page': (anonymous(f'/events/?after={deep_cursor}'), 200),
+            'event_detail': (anonymous(f'/events/{event.pk}/'), 200),
+            'my_events': (logged_in('/events/my-events/'), 200),
+            'login': (login(creator.username, BENCH_PASSWORD), 302),
+            'login_failed': (login('nobody@streamevents.com', 'wrong-password'), 200),
+            'profile': (logged_in('/users/profile/'), 200),
+            'public_profile': (logged_in(f'/users/profile/{creator.username}/'), 200),
+        }
+
+    def deep_cursor(self, pages):
+        """
+        Follows the list cursor `pages` pages deep, like a visitor would.
+        """
+        client = Client()
+        cursor = ''
+        for _ in range(pages):
+            response = client.get(f'/events/?after={cursor}' if cursor else '/events/')
+            page_obj = response.context['page_obj']
+            if not getattr(page_obj, 'next_cursor', None):
+                break
+            cursor = page_obj.next_cursor
+        return cursor
+
+    def measure(self, name, make_request, expected_status, iterations, warmup):
+        for _ in range(warmup):
+            make_request()
+        timings = []
+        queries = 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = make_request()
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != expected_status:
+                raise CommandError(f'{name}: expected HTTP {expected_status}, got {response.status_code}.')
+            queries = max(queries, len(captured))
+        return {
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': queries,
+        }
+
+    def compare(self, baseline, report, tolerance, slack_ms):
+        failures = []
+        if baseline.get('meta', {}).get('dataset') != report['meta']['dataset']:
+            failures.append('dataset differs from the baseline: results are not comparable')
+            return failures
+        for name, result in report['results'].items():
+            expected = baseline['results'].get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                failures.append(f"{name}: {result['queries']} queries (baseline {expected['queries']})")
+            limit = expected['p95_ms'] * tolerance + slack_ms
+            if result['p95_ms'] > limit:
+                failures.append(
+                    f"{name}: p95 {result['p95_ms']:.2f} ms (baseline {expected['p95_ms']:.2f} ms, limit {limit:.2f} ms)"
+                )
+        return failures
+
+    def write_json(self, path, data):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2, sort_keys=True) + '\n')
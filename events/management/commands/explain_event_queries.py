@@ -0,0 +1,155 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from events.models import Event, SearchTerm, Tag
+
+# Patrons d'accés de cada vista: camps d'igualtat + camp d'ordenació/rang
+QUERY_PATTERNS = [
+    {
+        'name': 'event_list',
+        'model': Event,
+        'equality': [],
+        'order': ['-created_at'],
+        'queryset': lambda sample: Event.objects.order_by('-created_at', '-pk')[:13],
+    },
+    {
+        'name': 'event_list (status filter)',
+        'model': Event,
+        'equality': ['status'],
+        'order': ['-created_at'],
+        'queryset': lambda sample: Event.objects.filter(status=sample.status).order_by('-created_at')[:13],
+    },
+    {
+        'name': 'events_by_category',
+        'model': Event,
+        'equality': ['category'],
+        'order': ['-created_at'],
+        'queryset': lambda sample: Event.objects.filter(category=sample.category).order_by('-created_at')[:13],
+    },
+    {
+        'name': 'my_events',
+        'model': Event,
+        'equality': ['creator'],
+        'order': ['-created_at'],
+        'queryset': lambda sample: Event.objects.filter(creator_id=sample.creator_id).order_by('-created_at'),
+    },
+    {
+        'name': 'featured_events',
+        'model': Event,
+        'equality': ['is_featured'],
+        'order': ['-created_at'],
+        'queryset': lambda sample: Event.objects.filter(is_featured=True).order_by('-created_at')[:6],
+    },
+    {
+        'name': 'featured_events (category)',
+        'model': Event,
+        'equality': ['is_featured', 'category'],
+        'order': ['-created_at'],
+        'queryset': lambda sample: Event.objects.filter(is_featured=True, category=sample.category).order_by('-created_at')[:6],
+    },
+    {
+        'name': 'update_event_status',
+        'model': Event,
+        'equality': ['status'],
+        'order': ['scheduled_date'],
+        'queryset': lambda sample: Event.objects.filter(status='scheduled', scheduled_date__lte=timezone.now()).order_by('scheduled_date'),
+    },
+    {
+        'name': 'update_event_status (finish)',
+        'model': Event,
+        'equality': ['status'],
+        'order': ['ends_at'],
+        'queryset': lambda sample: Event.objects.filter(status='live', ends_at__lte=timezone.now()).order_by('ends_at'),
+    },
+    {
+        'name': 'search (term lookup)',
+        'model': SearchTerm,
+        'equality': [],
+        'order': ['term'],
+        'queryset': lambda sample: SearchTerm.objects.filter(term__startswith='music').values('event_id'),
+    },
+    {
+        'name': 'popular_tags',
+        'model': Tag,
+        'equality': [],
+        'order': ['-event_count'],
+        'queryset': lambda sample: Tag.objects.filter(event_count__gt=0).order_by('-event_count', 'name')[:10],
+    },
+]
+
+
+def find_index(model, equality, order):
+    """
+    Returns the name of the first declared index whose leading fields are the
+    equality fields followed by the sort/range fields, or None.
+    """
+    wanted = list(equality) + [name.lstrip('-') for name in order]
+    for index in model._meta.indexes:
+        fields = [name.lstrip('-') for name in index.fields]
+        if fields[:len(wanted)] == wanted:
+            return index.name
+    return None
+
+
+def mongo_plan(pattern, sample):
+    """
+    Runs a MongoDB explain() equivalent to the pattern and returns the
+    (stage, index name) of the winning plan.
+    """
+    model = pattern['model']
+    collection = connection.connection[model._meta.db_table]
+    query = {}
+    for name in pattern['equality']:
+        field = model._meta.get_field(name)
+        query[field.column] = getattr(sample, field.attname)
+    sort = []
+    for name in pattern['order']:
+        field = model._meta.get_field(name.lstrip('-'))
+        sort.append((field.column, -1 if name.startswith('-') else 1))
+
+    plan = collection.find(query).sort(sort).limit(13).explain()['queryPlanner']['winningPlan']
+    while plan:
+        if plan.get('stage') in ('IXSCAN', 'COLLSCAN'):
+            return plan['stage'], plan.get('indexName')
+        plan = plan.get('inputStage')
+    return None, None
+
+
+class Command(BaseCommand):
+    help = 'Verifies that every view query of the events app is backed by an index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            default=False,
+            help='Also ask the database for the query plan of each query'
+        )
+
+    def handle(self, *args, **options):
+        missing = 0
+        sample = Event.objects.order_by('-created_at').first() if options['explain'] else None
+        if options['explain'] and sample is None:
+            raise CommandError('There are no events to build sample queries from.')
+
+        for pattern in QUERY_PATTERNS:
+            index_name = find_index(pattern['model'], pattern['equality'], pattern['order'])
+            if index_name:
+                self.stdout.write(self.style.SUCCESS(f'{pattern["name"]}: covered by {index_name}'))
+            else:
+                missing += 1
+                self.stdout.write(self.style.ERROR(f'{pattern["name"]}: no matching index'))
+
+            if not options['explain']:
+                continue
+            if connection.vendor == 'djongo':
+                stage, used = mongo_plan(pattern, sample)
+                self.stdout.write(f'    plan: {stage} {used or ""}')
+            else:
+                plan = pattern['queryset'](sample).explain()
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if missing:
+            raise CommandError(f'{missing} queries are not covered by an index.')
+        self.stdout.write(self.style.SUCCESS('All event queries are covered by an index.'))
@@ -0,0 +1,63 @@
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from events.models import Event
+from events.thumbnails import RENDITIONS, rendition_name
+
+# Directoris (relatius a MEDIA_ROOT) que contenen pujades gestionades
+MEDIA_DIRS = ['events/thumbnails', 'avatars']
+
+class Command(BaseCommand):
+    help = 'Deletes uploaded files (and thumbnail renditions) that no event or user references anymore.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Only delete files older than this many seconds (protects in-flight uploads)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help='List the files that would be deleted without deleting them'
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        thumbnails = Event.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True)
+        for name in thumbnails.values_list('thumbnail', flat=True).iterator():
+            referenced.add(name)
+            referenced.update(rendition_name(name, rendition) for rendition in RENDITIONS)
+        avatars = get_user_model().objects.exclude(avatar='').exclude(avatar__isnull=True)
+        referenced.update(avatars.values_list('avatar', flat=True).iterator())
+
+        media_root = str(settings.MEDIA_ROOT)
+        threshold = time.time() - options['min_age']
+        deleted = freed = 0
+
+        for media_dir in MEDIA_DIRS:
+            for root, dirs, files in os.walk(os.path.join(media_root, media_dir)):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, media_root).replace(os.sep, '/')
+                    if name in referenced:
+                        continue
+                    stat = os.stat(path)
+                    if stat.st_mtime > threshold:
+                        continue
+                    deleted += 1
+                    freed += stat.st_size
+                    if options['dry_run']:
+                        self.stdout.write(f'  would delete {name}')
+                    else:
+                        os.remove(path)
+
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {deleted} unreferenced files ({freed / 1024 / 1024:.1f} MB).'
+        ))
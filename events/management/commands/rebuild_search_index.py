@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from events.search import rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of every event.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of events processed per batch'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding search index...')
+        count = rebuild_index(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {count} events.'))
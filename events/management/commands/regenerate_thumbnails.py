@@ -0,0 +1,59 @@
+from concurrent.futures import wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from events import thumbnails
+from events.models import Event
+
+class Command(BaseCommand):
+    help = 'Generates the responsive renditions of existing event thumbnails.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            default=False,
+            help='Regenerate every thumbnail, not only the ones without renditions'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of thumbnails queued at once'
+        )
+
+    def handle(self, *args, **options):
+        if thumbnails.Image is None:
+            raise CommandError('Pillow is not installed.')
+
+        events = Event.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True)
+        if not options['all']:
+            events = events.filter(renditions_ready=False)
+        events = events.only('id', 'category', 'thumbnail').order_by('pk')
+
+        count = failed = 0
+        batch = []
+        for event in events.iterator(chunk_size=options['batch_size']):
+            batch.append(event)
+            if len(batch) == options['batch_size']:
+                failed += self.process(batch)
+                count += len(batch)
+                batch = []
+                self.stdout.write(f'  {count} thumbnails processed...')
+        if batch:
+            failed += self.process(batch)
+            count += len(batch)
+
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} thumbnails failed, see the log for details.'))
+        self.stdout.write(self.style.SUCCESS(f'Successfully processed {count - failed} thumbnails.'))
+
+    def process(self, events):
+        if not settings.THUMBNAIL_WORKERS:
+            for event in events:
+                thumbnails.schedule_renditions(event)
+            return Event.objects.filter(pk__in=[event.pk for event in events], renditions_ready=False).count()
+
+        futures = [thumbnails.schedule_renditions(event) for event in events]
+        done, _ = wait([future for future in futures if future is not None])
+        return sum(1 for future in done if future.exception() is not None)
@@ -0,0 +1,266 @@
+import random
+import string
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from events.caching import bump_version
+from events.feed import rebuild_timelines
+from events.models import Event, SearchTerm, Tag, TimelineEntry
+from events.providers import match_stream
+from events.search import rebuild_index
+from events.tags import backfill_tags
+
+# Pes relatiu de cada categoria (com es reparteix el catàleg real)
+CATEGORY_WEIGHTS = {
+    'gaming': 30, 'entertainment': 12, 'music': 15, 'talk': 10, 'education': 10,
+    'technology': 10, 'sports': 8, 'art': 3, 'other': 2,
+}
+TOPICS = {
+    'gaming': ['Minecraft', 'Speedrun', 'Fortnite', 'League of Legends', 'Valorant', 'Retro', 'Indie', 'Zelda'],
+    'music': ['Concert', 'DJ Set', 'Acústic', 'Jazz', 'Rock', 'Electrònica', 'Assaig', 'Jam'],
+    'talk': ['Podcast', 'Entrevista', 'Debat', 'Tertúlia', 'AMA', 'Actualitat'],
+    'education': ['Classe', 'Tutorial', 'Matemàtiques', 'Història', 'Idiomes', 'Repàs', 'Taller'],
+    'sports': ['Futbol', 'Bàsquet', 'Ciclisme', 'Escalada', 'Running', 'eSports'],
+    'entertainment': ['Reacció', 'Concurs', 'Humor', 'Xat', 'Sorteig', 'Maratons'],
+    'technology': ['Python', 'Django', 'JavaScript', 'Linux', 'IA', 'Hardware', 'Ciberseguretat', 'Cloud'],
+    'art': ['Il·lustració', 'Pintura', 'Modelatge 3D', 'Fotografia', 'Disseny'],
+    'other': ['Cuina', 'Viatges', 'Jardineria', 'Manualitats'],
+}
+FORMATS = ['en directe', 'de la setmana', 'per a principiants', 'avançat', 'amb convidats', 'especial', 'nocturn']
+DURATIONS = [(timedelta(minutes=30), 15), (timedelta(hours=1), 35), (timedelta(hours=1, minutes=30), 20),
+             (timedelta(hours=2), 20), (timedelta(hours=3), 10)]
+# Finestra de dates: molt passat i poc futur, concentrat al voltant d'avui
+PAST_DAYS = 365
+FUTURE_DAYS = 60
+FEATURED_RATE = 0.01
+CANCELLED_RATE = 0.04
+STREAM_RATE = 0.6
+
+User = get_user_model()
+
+
+@contextmanager
+def explicit_timestamps():
+    """
+    Lets bulk_create keep the generated created_at/updated_at instead of
+    overwriting them with auto_now_add/auto_now.
+    """
+    fields = [Event._meta.get_field('created_at'), Event._meta.get_field('updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def delete_events(event_ids=None, batch_size=1000):
+    """
+    Deletes events (every event with event_ids=None) and the rows that
+    depend on them with plain DELETEs, without per-row signals. The counts
+    of the tags of a partial deletion are decremented; cached pages are not
+    invalidated.
+    """
+    Through = Event.normalized_tags.through
+    if event_ids is None:
+        for queryset in (SearchTerm.objects.all(), TimelineEntry.objects.all(), Through.objects.all(), Event.objects.all()):
+            queryset._raw_delete(queryset.db)
+        return
+
+    for start in range(0, len(event_ids), batch_size):
+        batch = event_ids[start:start + batch_size]
+        links = Through.objects.filter(event_id__in=batch)
+        released = Counter(links.values_list('tag_id', flat=True))
+        for queryset in (
+            SearchTerm.objects.filter(event_id__in=batch),
+            TimelineEntry.objects.filter(event_id__in=batch),
+            links,
+            Event.objects.filter(pk__in=batch),
+        ):
+            queryset._raw_delete(queryset.db)
+        # Una actualització per quantitat, no per etiqueta
+        by_amount = {}
+        for tag_id, amount in released.items():
+            by_amount.setdefault(amount, []).append(tag_id)
+        for amount, tag_ids in by_amount.items():
+            Tag.objects.filter(pk__in=tag_ids).update(event_count=F('event_count') - amount)
+
+
+class Command(BaseCommand):
+    help = 'Generates a large, reproducible set of events with realistic distributions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=10000,
+            help='Number of events to create'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed (same seed and reference date give the same data)'
+        )
+        parser.add_argument(
+            '--reference-date',
+            default=None,
+            help='Day (YYYY-MM-DD) the dates are generated around (defaults to today)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of events per bulk insert'
+        )
+        parser.add_argument(
+            '--creators',
+            choices=['organizers', 'all'],
+            default='organizers',
+            help='Attach events to the seed_users organizers or to every non-superuser'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            default=False,
+            help='Delete every existing event first'
+        )
+        parser.add_argument(
+            '--skip-derived',
+            action='store_true',
+            default=False,
+            help='Do not rebuild the search index, tags and timelines afterwards'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        if options['reference_date']:
+            day = datetime.strptime(options['reference_date'], '%Y-%m-%d').date()
+        else:
+            day = timezone.now().date()
+        self.now = datetime.combine(day, dt_time(12), tzinfo=dt_timezone.utc)
+
+        creators = self.creator_ids(options['creators'])
+        if not creators:
+            raise CommandError('No users to attach the events to: run seed_users first.')
+        # Activitat de Zipf: uns pocs creadors publiquen molts esdeveniments
+        self.creators = creators
+        self.creator_weights = list(accumulate(1 / (rank + 1) for rank in range(len(creators))))
+        self.categories = list(CATEGORY_WEIGHTS)
+        self.category_weights = list(accumulate(CATEGORY_WEIGHTS.values()))
+        self.durations = [duration for duration, _ in DURATIONS]
+        self.duration_weights = list(accumulate(weight for _, weight in DURATIONS))
+
+        if options['clear']:
+            self.clear()
+
+        total = options['events']
+        offset = Event.objects.count()
+        created = 0
+        start = time.monotonic()
+        with explicit_timestamps():
+            while created < total:
+                size = min(batch_size, total - created)
+                events = [self.build_event(offset + created + i + 1) for i in range(size)]
+                with transaction.atomic():
+                    Event.objects.bulk_create(events, batch_size=batch_size)
+                created += size
+                elapsed = time.monotonic() - start
+                self.stdout.write(f'  {created}/{total} events ({created / elapsed:.0f} events/s)')
+
+        if not options['skip_derived']:
+            self.stdout.write('Rebuilding the search index, tags and timelines...')
+            rebuild_index(batch_size=batch_size)
+            backfill_tags(batch_size=batch_size)
+            rebuild_timelines(batch_size=batch_size)
+
+        categories = [f'category:{category}' for category in self.categories]
+        bump_version('list', 'featured', 'tags', *categories)
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully created {created} events in {time.monotonic() - start:.1f}s.'
+        ))
+
+    def creator_ids(self, mode):
+        users = User.objects.filter(is_superuser=False)
+        if mode == 'organizers':
+            organizers = users.filter(groups__name='Organitzadors')
+            if organizers.exists():
+                users = organizers
+        ids = list(users.order_by('pk').values_list('pk', flat=True))
+        self.random.shuffle(ids)
+        return ids
+
+    def clear(self):
+        self.stdout.write('Deleting existing events...')
+        # DELETE directes: les dades derivades es reconstrueixen al final
+        delete_events()
+
+    def build_event(self, number):
+        rnd = self.random
+        category = rnd.choices(self.categories, cum_weights=self.category_weights)[0]
+        topics = TOPICS[category]
+        topic = rnd.choice(topics)
+
+        # Més densitat a prop d'avui: distància exponencial cap enrere o endavant
+        if rnd.random() < 0.8:
+            offset = -min(rnd.expovariate(1 / 60), PAST_DAYS)
+        else:
+            offset = min(rnd.expovariate(1 / 14), FUTURE_DAYS)
+        scheduled_date = (self.now + timedelta(days=offset)).replace(second=0, microsecond=0)
+        duration = rnd.choices(self.durations, cum_weights=self.duration_weights)[0]
+        ends_at = scheduled_date + duration
+
+        if rnd.random() < CANCELLED_RATE:
+            status = 'cancelled'
+        elif scheduled_date > self.now:
+            status = 'scheduled'
+        elif ends_at > self.now:
+            status = 'live'
+        else:
+            status = 'finished'
+
+        tags = [topic.lower(), category] + rnd.sample(topics, k=min(len(topics), rnd.randint(0, 2)))
+        tags = list(dict.fromkeys(tag.lower() for tag in tags))
+
+        stream_url = ''
+        if rnd.random() < STREAM_RATE:
+            if rnd.random() < 0.6:
+                video = ''.join(rnd.choices(string.ascii_letters + string.digits + '_-', k=11))
+                stream_url = f'https://www.youtube.com/watch?v={video}'
+            else:
+                stream_url = f'https://www.twitch.tv/canal_{rnd.randint(1, 50000)}'
+        provider, ref, embed_url = match_stream(stream_url)
+
+        created_at = min(scheduled_date - timedelta(days=rnd.expovariate(1 / 10)), self.now)
+        title = f'{topic} {rnd.choice(FORMATS)} #{number}'
+        return Event(
+            title=title,
+            description=f"{title}. Sessió de {topic} ({category}) amb xat obert per a tota la comunitat.",
+            category=category,
+            scheduled_date=scheduled_date,
+            duration=duration,
+            ends_at=ends_at,
+            status=status,
+            max_viewers=max(10, int(rnd.lognormvariate(5, 1))),
+            is_featured=rnd.random() < FEATURED_RATE,
+            tags=', '.join(tags),
+            stream_url=stream_url,
+            stream_provider=provider,
+            stream_ref=ref,
+            stream_embed_url=embed_url,
+            creator_id=rnd.choices(self.creators, cum_weights=self.creator_weights)[0],
+            created_at=created_at,
+            updated_at=created_at,
+        )
@@ -1,22 +1,55 @@
+import signal
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from events.models import Event
+from events.scheduler import StatusScheduler, run_due_transitions
 
 class Command(BaseCommand):
-    help = 'Updates the status of scheduled events to live if their start time has passed.'
+    help = 'Moves scheduled events to live and live events to finished when their time has passed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--daemon',
+            action='store_true',
+            default=False,
+            help='Keep running and wake up at each upcoming transition instead of exiting'
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=60,
+            help='Minutes ahead loaded into the daemon schedule'
+        )
+        parser.add_argument(
+            '--refresh',
+            type=int,
+            default=60,
+            help='Seconds between reloads of the daemon schedule'
+        )
+
+    def handle(self, *args, **options):
+        if not options['daemon']:
+            self.report(run_due_transitions())
+            return
+
+        scheduler = StatusScheduler(
+            horizon=timedelta(minutes=options['horizon']),
+            refresh_interval=options['refresh'],
+            on_transitions=self.report,
+        )
+        signal.signal(signal.SIGTERM, lambda *args: scheduler.stop())
+        signal.signal(signal.SIGINT, lambda *args: scheduler.stop())
+
+        self.stdout.write(self.style.SUCCESS('Status scheduler running (Ctrl+C to stop).'))
+        scheduler.run()
+        self.stdout.write(self.style.SUCCESS('Status scheduler stopped.'))
 
-    def handle(self, *args, **kwargs):
-        now = timezone.now()
-        # Find scheduled events that should be live
-        events_to_update = Event.objects.filter(status='scheduled', scheduled_date__lte=now)
-        
-        count = 0
-        for event in events_to_update:
-            if event.update_status():
-                count += 1
-                self.stdout.write(self.style.SUCCESS(f'Event "{event.title}" is now LIVE.'))
-        
-        if count == 0:
+    def report(self, transitions):
+        if not transitions:
             self.stdout.write(self.style.SUCCESS('No events needed updating.'))
-        else:
-            self.stdout.write(self.style.SUCCESS(f'Successfully updated {count} events.'))
\ No newline at end of file
+            return
+        live = sum(1 for t in transitions if t[4] == 'live')
+        finished = sum(1 for t in transitions if t[4] == 'finished')
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully updated {len(transitions)} events ({live} now LIVE, {finished} FINISHED).'
+        ))
@@ -0,0 +1,68 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:19
+
+from django.db import migrations, models
+
+
+def rename_duplicate_titles(apps, schema_editor):
+    """
+    Makes (creator, title) unique before the constraint is added: the oldest
+    event keeps its title and the later ones get a " (2)", " (3)"... suffix.
+    """
+    Event = apps.get_model('events', 'Event')
+    taken = set()
+    duplicates = []
+    rows = Event.objects.order_by('creator_id', 'pk').values_list('pk', 'creator_id', 'title')
+    for pk, creator_id, title in rows.iterator():
+        if (creator_id, title) in taken:
+            duplicates.append((pk, creator_id, title))
+        taken.add((creator_id, title))
+
+    for pk, creator_id, title in duplicates:
+        number = 2
+        while True:
+            suffix = f' ({number})'
+            candidate = title[:200 - len(suffix)] + suffix
+            if (creator_id, candidate) not in taken:
+                break
+            number += 1
+        taken.add((creator_id, candidate))
+        Event.objects.filter(pk=pk).update(title=candidate)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['-created_at', '-id'], name='event_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'scheduled_date'], name='event_status_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', '-created_at'], name='event_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['category', '-created_at'], name='event_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['creator', '-created_at'], name='event_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_featured', '-created_at'], name='event_featured_created_idx'),
+        ),
+        migrations.RunPython(rename_duplicate_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('creator', 'title'), name='unique_event_title_per_creator'),
+        ),
+    ]
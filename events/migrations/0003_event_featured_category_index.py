@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_featured', 'category', '-created_at'], name='event_featured_cat_idx'),
+        ),
+    ]
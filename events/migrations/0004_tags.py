@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_featured_category_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('event_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Etiqueta',
+                'verbose_name_plural': 'Etiquetes',
+                'ordering': ['-event_count', 'name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-event_count', 'name'], name='tag_popularity_idx'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='normalized_tags',
+            field=models.ManyToManyField(blank=True, related_name='events', to='events.tag'),
+        ),
+    ]
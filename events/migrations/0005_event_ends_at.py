@@ -0,0 +1,29 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:24
+
+from django.db import migrations, models
+
+
+def fill_ends_at(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    for event in Event.objects.filter(duration__isnull=False).only('id', 'scheduled_date', 'duration'):
+        Event.objects.filter(pk=event.pk).update(ends_at=event.scheduled_date + event.duration)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['status', 'ends_at'], name='event_status_ends_idx'),
+        ),
+        migrations.RunPython(fill_ends_at, migrations.RunPython.noop),
+    ]
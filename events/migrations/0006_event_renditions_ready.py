@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_ends_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='renditions_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_renditions_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='stream_embed_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='stream_provider',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='stream_ref',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
@@ -1,15 +1,30 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.core.files.base import ContentFile
+from django.db.models.fields.files import FieldFile
 from io import BytesIO
 import os
-import re
 
-try:
-    from PIL import Image
-except ImportError:
-    Image = None
+from .providers import match_stream
+from .thumbnails import rendition_urls, schedule_renditions
+
+class EventQuerySet(models.QuerySet):
+    # Camps que necessiten les targetes (includes/event_card.html i my_events.html)
+    CARD_FIELDS = (
+        'id', 'title', 'category', 'status', 'scheduled_date', 'thumbnail',
+        'is_featured', 'created_at', 'creator', 'renditions_ready',
+    )
+
+    def for_cards(self, with_creator=True):
+        """
+        Loads only the columns rendered by the event cards, with the creator
+        joined in the same query to avoid one extra query per card.
+        """
+        if not with_creator:
+            return self.only(*self.CARD_FIELDS)
+        return self.select_related('creator').only(*self.CARD_FIELDS, 'creator__username')
+
 
 class Event(models.Model):
     CATEGORY_CHOICES = [
@@ -37,23 +52,77 @@ class Event(models.Model):
     scheduled_date = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     thumbnail = models.ImageField(upload_to='events/thumbnails/', blank=True, null=True)
+    # Les mides responsives (events.thumbnails) ja s'han generat
+    renditions_ready = models.BooleanField(default=False, editable=False)
     max_viewers = models.PositiveIntegerField(default=100)
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     tags = models.CharField(max_length=500, blank=True)
     stream_url = models.URLField(max_length=500, blank=True)
+    # Derivats de stream_url en desar (events.providers)
+    stream_provider = models.CharField(max_length=20, blank=True, editable=False)
+    stream_ref = models.CharField(max_length=100, blank=True, editable=False)
+    stream_embed_url = models.URLField(max_length=500, blank=True, editable=False)
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     duration = models.DurationField(null=True, blank=True)
+    # scheduled_date + duration, calculat en desar (l'usa el planificador d'estats)
+    ends_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Còpia normalitzada de `tags` (es manté des de events.tags)
+    normalized_tags = models.ManyToManyField('Tag', related_name='events', blank=True)
+
+    objects = EventQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Esdeveniment'
         verbose_name_plural = 'Esdeveniments'
         ordering = ['-created_at']
+        indexes = [
+            # Llistat general i paginació per cursor (created_at, pk)
+            models.Index(fields=['-created_at', '-id'], name='event_created_idx'),
+            # Actualitzador d'estats: status='scheduled' AND scheduled_date <= ara
+            models.Index(fields=['status', 'scheduled_date'], name='event_status_sched_idx'),
+            models.Index(fields=['status', 'ends_at'], name='event_status_ends_idx'),
+            models.Index(fields=['status', '-created_at'], name='event_status_created_idx'),
+            models.Index(fields=['category', '-created_at'], name='event_category_created_idx'),
+            models.Index(fields=['creator', '-created_at'], name='event_creator_created_idx'),
+            models.Index(fields=['is_featured', '-created_at'], name='event_featured_created_idx'),
+            models.Index(fields=['is_featured', 'category', '-created_at'], name='event_featured_cat_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['creator', 'title'], name='unique_event_title_per_creator'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guardem els valors carregats per saber què ha canviat en desar
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def has_changed(self, *fields):
+        """
+        Returns True if any of the given fields differs from the value loaded
+        from the database (always True for new or partially loaded instances).
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        for name in fields:
+            attname = self._meta.get_field(name).attname
+            if attname not in loaded or loaded[attname] != self._raw_value(attname):
+                return True
+        return False
+
+    def _raw_value(self, attname):
+        value = getattr(self, attname)
+        if isinstance(value, FieldFile):
+            return value.name or None
+        return value
+
     def get_absolute_url(self):
         from django.urls import reverse
         return reverse('events:event_detail', kwargs={'pk': self.pk})
@@ -62,12 +131,17 @@ class Event(models.Model):
         """
         Updates the status based on the scheduled date and current time.
         Scheduled -> Live (if time passed)
+        Live -> Finished (if scheduled_date + duration passed)
         """
         now = timezone.now()
         if self.status == 'scheduled' and self.scheduled_date <= now:
             self.status = 'live'
             self.save(update_fields=['status'])
             return True
+        if self.status == 'live' and self.ends_at and self.ends_at <= now:
+            self.status = 'finished'
+            self.save(update_fields=['status'])
+            return True
         return False
 
     @property
@@ -80,23 +154,23 @@ class Event(models.Model):
 
     def get_stream_embed_url(self):
         """
-        Returns the embed URL for YouTube or Twitch based on stream_url.
+        Returns the embed URL precomputed from stream_url on save.
         """
         if not self.stream_url:
             return None
-        
-        youtube_regex = r'(?:https?:\/\/)?(?:www\.)?(?:youtube\.com\/(?:[^\/\n\s]+\/\S+\/|(?:v|e(?:mbed)?)\/|\S*?[?&]v=)|youtu\.be\/)([a-zA-Z0-9_-]{11})'
-        match = re.search(youtube_regex, self.stream_url)
-        if match:
-            video_id = match.group(1)
-            return f"https://www.youtube.com/embed/{video_id}"
-        twitch_regex = r'(?:https?:\/\/)?(?:www\.)?twitch\.tv\/([a-zA-Z0-9_]+)'
-        match = re.search(twitch_regex, self.stream_url)
-        if match:
-            channel_name = match.group(1)
-            return f"https://player.twitch.tv/?channel={channel_name}&parent=localhost&parent=127.0.0.1"
-
-        return self.stream_url
+        if not self.stream_embed_url:
+            # Files encara no processades per backfill_stream_embeds
+            return match_stream(self.stream_url)[2]
+        return self.stream_embed_url
+
+    @property
+    def thumbnail_renditions(self):
+        """
+        URLs of the responsive renditions, or None while they are not ready.
+        """
+        if not self.thumbnail or not self.renditions_ready:
+            return None
+        return rendition_urls(self.thumbnail.name)
 
     def get_tags_list(self):
         if not self.tags:
@@ -104,18 +178,92 @@ class Event(models.Model):
         return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
 
     def save(self, *args, **kwargs):
-        if not self.thumbnail:
-            pass
-
-        if self.thumbnail and Image:
-            super().save(*args, **kwargs)
-            try:
-                img = Image.open(self.thumbnail.path)
-                if img.height > 720 or img.width > 1280:
-                    output_size = (1280, 720)
-                    img.thumbnail(output_size)
-                    img.save(self.thumbnail.path, quality=85, optimize=True)
-            except Exception as e:
-                pass
-        else:
-            super().save(*args, **kwargs)
+        self.ends_at = self.scheduled_date + self.duration if self.scheduled_date and self.duration else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'scheduled_date', 'duration'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'ends_at'}
+
+        if (update_fields is None or 'stream_url' in update_fields) and self.has_changed('stream_url'):
+            self.stream_provider, self.stream_ref, self.stream_embed_url = match_stream(self.stream_url)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {
+                    'stream_provider', 'stream_ref', 'stream_embed_url',
+                }
+
+        thumbnail_changed = (
+            (update_fields is None or 'thumbnail' in update_fields) and self.has_changed('thumbnail')
+        )
+        if thumbnail_changed:
+            self.renditions_ready = False
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'renditions_ready'}
+
+        super().save(*args, **kwargs)
+
+        # El processament d'imatges es fa fora de la petició (events.thumbnails)
+        if thumbnail_changed and self.thumbnail:
+            transaction.on_commit(lambda: schedule_renditions(self))
+
+        self._loaded_values = {
+            f.attname: self._raw_value(f.attname) for f in self._meta.concrete_fields
+        }
+
+
+class Tag(models.Model):
+    """
+    Normalized tag with a denormalized count of the events that use it.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    event_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Etiqueta'
+        verbose_name_plural = 'Etiquetes'
+        ordering = ['-event_count', 'name']
+        indexes = [
+            models.Index(fields=['-event_count', 'name'], name='tag_popularity_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class TimelineEntry(models.Model):
+    """
+    Precomputed home feed row: an upcoming or live event of a creator that
+    `user` follows (fan-out on write, maintained from events.feed).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='timeline', on_delete=models.CASCADE)
+    event = models.ForeignKey(Event, related_name='timeline_entries', on_delete=models.CASCADE)
+    creator = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    # Còpia de event.scheduled_date: el feed es llegeix per aquest ordre
+    scheduled_date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'scheduled_date'], name='timeline_user_sched_idx'),
+            models.Index(fields=['user', 'creator'], name='timeline_user_creator_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'event'], name='unique_timeline_entry'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.event_id}'
+
+
+class SearchTerm(models.Model):
+    """
+    Inverted index entry: one normalized term of an event with its weight.
+    """
+    event = models.ForeignKey(Event, related_name='search_terms', on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'event'], name='searchterm_term_event_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.term} ({self.weight})'
@@ -0,0 +1,130 @@
+import re
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+PROVIDERS = []
+
+
+class StreamProvider:
+    """
+    A streaming platform: a compiled pattern that extracts the video or
+    channel reference from a stream URL and a function that builds the
+    embed URL from that reference.
+    """
+
+    def __init__(self, name, pattern, build):
+        self.name = name
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.build = build
+
+    def match(self, url):
+        match = self.pattern.search(url)
+        return match.group(1) if match else None
+
+
+def register_provider(name, pattern):
+    """
+    Decorator that registers an embed URL builder for the URLs matching
+    `pattern` (its first group is the reference). Providers are tried in
+    registration order.
+    """
+    def decorator(build):
+        PROVIDERS.append(StreamProvider(name, pattern, build))
+        return build
+    return decorator
+
+
+def match_stream(url):
+    """
+    Returns (provider, reference, embed URL) for a stream URL. Unknown
+    platforms keep the URL itself as embed URL with an empty provider.
+    """
+    if not url:
+        return '', '', ''
+    for provider in PROVIDERS:
+        ref = provider.match(url)
+        if ref:
+            return provider.name, ref, provider.build(ref)
+    return '', '', url
+
+
+def embed_parents():
+    """
+    Hosts Twitch must allow to embed its player (the `parent` parameter).
+    """
+    parents = getattr(settings, 'STREAM_EMBED_PARENTS', None)
+    if parents is None:
+        parents = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return parents or ['localhost']
+
+
+@register_provider(
+    'youtube',
+    r'(?:https?://)?(?:www\.|m\.)?(?:youtube\.com/(?:[^/\n\s]+/\S+/|(?:v|e(?:mbed)?|live)/|\S*?[?&]v=)|youtu\.be/)([a-zA-Z0-9_-]{11})',
+)
+def youtube_embed(ref):
+    return f'https://www.youtube.com/embed/{ref}'
+
+
+@register_provider('twitch_video', r'(?:https?://)?(?:www\.|m\.)?twitch\.tv/videos/(\d+)')
+def twitch_video_embed(ref):
+    params = [('video', ref)] + [('parent', parent) for parent in embed_parents()]
+    return f'https://player.twitch.tv/?{urlencode(params)}'
+
+
+@register_provider('twitch', r'(?:https?://)?(?:www\.|m\.)?twitch\.tv/([a-zA-Z0-9_]+)')
+def twitch_embed(ref):
+    params = [('channel', ref)] + [('parent', parent) for parent in embed_parents()]
+    return f'https://player.twitch.tv/?{urlencode(params)}'
+
+
+@register_provider('vimeo', r'(?:https?://)?(?:www\.|player\.)?vimeo\.com/(?:video/)?(\d+)')
+def vimeo_embed(ref):
+    return f'https://player.vimeo.com/video/{ref}'
+
+
+@register_provider('kick', r'(?:https?://)?(?:www\.)?kick\.com/([a-zA-Z0-9_-]+)')
+def kick_embed(ref):
+    return f'https://player.kick.com/{ref}'
+
+
+def backfill_stream_embeds(batch_size=1000, stdout=None):
+    """
+    Recomputes the stored provider, reference and embed URL of every event
+    with a stream URL. Returns (events processed, events changed).
+    """
+    from django.utils import timezone
+
+    from .caching import bump_version
+    from .models import Event
+
+    def flush(pending):
+        # updated_at a mà: bulk_update no aplica auto_now (ETag de l'API)
+        now = timezone.now()
+        for event in pending:
+            event.updated_at = now
+        Event.objects.bulk_update(pending, fields + ['updated_at'], batch_size=batch_size)
+        # bulk_update no passa per save(): invalidem les pàgines de detall
+        bump_version(*(f'event:{event.pk}' for event in pending))
+
+    fields = ['stream_provider', 'stream_ref', 'stream_embed_url']
+    processed = changed = 0
+    pending = []
+
+    events = Event.objects.exclude(stream_url='').only('id', 'stream_url', 'updated_at', *fields).order_by('pk')
+    for event in events.iterator(chunk_size=batch_size):
+        values = match_stream(event.stream_url)
+        if values != tuple(getattr(event, field) for field in fields):
+            event.stream_provider, event.stream_ref, event.stream_embed_url = values
+            pending.append(event)
+            changed += 1
+
+        processed += 1
+        if processed % batch_size == 0:
+            flush(pending)
+            pending = []
+            if stdout:
+                stdout.write(f'  {processed} events processed...')
+    flush(pending)
+    return processed, changed
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_max_queries(max_queries, using=DEFAULT_DB_ALIAS, label='block'):
+    """
+    Fails with QueryBudgetExceeded if the block runs more than `max_queries`
+    queries. Usable directly from tests:
+
+        with assert_max_queries(4):
+            self.client.get(reverse('events:event_list'))
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > max_queries:
+        queries = '\n'.join(f'  {i}. {q["sql"]}' for i, q in enumerate(context.captured_queries, 1))
+        raise QueryBudgetExceeded(
+            f'{label} ran {len(context)} queries, over its budget of {max_queries}:\n{queries}'
+        )
+
+
+def query_budget(max_queries):
+    """
+    Declares the maximum number of queries a view may run. The budget is only
+    checked when settings.QUERY_BUDGETS_ENFORCED is True (e.g. in tests with
+    override_settings), so it costs nothing in production.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'QUERY_BUDGETS_ENFORCED', False):
+                return view(request, *args, **kwargs)
+            with assert_max_queries(max_queries, label=view.__name__):
+                return view(request, *args, **kwargs)
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
@@ -0,0 +1,154 @@
+import heapq
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from config.metrics import counter, histogram
+
+from .caching import bump_version
+from .feed import remove_from_timelines
+from .live import publish_status
+from .models import Event
+
+BATCH_SIZE = 1000
+
+# (estat actual, estat nou, camp que marca el moment de la transició)
+TRANSITIONS = [
+    ('scheduled', 'live', 'scheduled_date'),
+    ('live', 'finished', 'ends_at'),
+]
+
+RUN_DURATION = histogram('scheduler_run_duration_seconds', 'Duration of a status scheduler pass.')
+TRANSITIONS_APPLIED = counter(
+    'scheduler_transitions_total', 'Event status transitions applied by the scheduler.', ('old', 'new'),
+)
+
+
+def due_batches(old, field, now):
+    """
+    Yields the events in status `old` whose `field` is due at `now`, as
+    lists of at most BATCH_SIZE (pk, category, is_featured, field) rows.
+    Each batch is read with a keyset condition on (field, pk) after the
+    previous one, so memory stays bounded however many rows are due.
+    """
+    due = (
+        Event.objects.filter(status=old, **{f'{field}__lte': now})
+        .order_by(field, 'pk')
+        .values_list('pk', 'category', 'is_featured', field)
+    )
+    last = None
+    while True:
+        page = due
+        if last is not None:
+            last_pk, last_value = last
+            page = due.filter(Q(**{f'{field}__gt': last_value}) | Q(**{field: last_value, 'pk__gt': last_pk}))
+        batch = list(page[:BATCH_SIZE])
+        if batch:
+            yield batch
+        if len(batch) < BATCH_SIZE:
+            return
+        last = (batch[-1][0], batch[-1][3])
+
+
+def run_due_transitions(now=None):
+    """
+    Applies every status transition that is due at `now`, in batches of
+    conditional updates (filter(pk__in=..., status=old).update(status=new)).
+    The status condition makes it idempotent and safe to run from several
+    processes at once: a row only moves once.
+
+    Returns a list of (pk, category, is_featured, old, new) tuples.
+    """
+    now = now or timezone.now()
+    transitions = []
+    with RUN_DURATION.time():
+        for old, new, field in TRANSITIONS:
+            for batch in due_batches(old, field, now):
+                pks = [row[0] for row in batch]
+                updated = Event.objects.filter(pk__in=pks, status=old).update(status=new, updated_at=now)
+                if 0 < updated < len(batch):
+                    # Una altra instància n'ha mogut una part: només informem de les nostres
+                    moved = set(Event.objects.filter(
+                        pk__in=pks, status=new, updated_at=now,
+                    ).values_list('pk', flat=True))
+                    batch = [row for row in batch if row[0] in moved]
+                if updated:
+                    transitions.extend((pk, category, featured, old, new) for pk, category, featured, _ in batch)
+                    TRANSITIONS_APPLIED.inc(len(batch), old=old, new=new)
+
+        if transitions:
+            notify_transitions(transitions)
+    return transitions
+
+
+def notify_transitions(transitions):
+    """
+    Invalidates the cached pages affected by bulk status transitions, which
+    do not go through Event.save() and its signals, and announces them to
+    the live status viewers.
+    """
+    names = {'list'}
+    for pk, category, featured, old, new in transitions:
+        names.add(f'event:{pk}')
+        names.add(f'category:{category}')
+        if featured:
+            names.add('featured')
+    bump_version(*names)
+    remove_from_timelines([pk for pk, category, featured, old, new in transitions if new == 'finished'])
+    # Després d'invalidar: qui recarregui en rebre l'avís ja veu la pàgina nova
+    for pk, category, featured, old, new in transitions:
+        publish_status(pk, category, old, new)
+
+
+class StatusScheduler:
+    """
+    Long-running scheduler: keeps a min-heap with the upcoming transition
+    times inside `horizon` and sleeps until the next one instead of polling.
+    The heap is reloaded every `refresh_interval` seconds to pick up events
+    created or rescheduled meanwhile.
+    """
+
+    def __init__(self, horizon=timedelta(hours=1), refresh_interval=60, on_transitions=None):
+        self.horizon = horizon
+        self.refresh_interval = refresh_interval
+        self.on_transitions = on_transitions
+        self.heap = []
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def load(self, now):
+        limit = now + self.horizon
+        heap = []
+        for old, new, field in TRANSITIONS:
+            times = Event.objects.filter(
+                status=old, **{f'{field}__gt': now, f'{field}__lte': limit}
+            ).order_by().values_list(field, flat=True)
+            heap.extend(times)
+        heapq.heapify(heap)
+        self.heap = heap
+
+    def next_wakeup(self, now, refresh_at):
+        while self.heap and self.heap[0] <= now:
+            heapq.heappop(self.heap)
+        wakeup = min(self.heap[0], refresh_at) if self.heap else refresh_at
+        return max((wakeup - now).total_seconds(), 0)
+
+    def run(self):
+        refresh_at = timezone.now()
+        while not self._stop.is_set():
+            close_old_connections()
+            now = timezone.now()
+            transitions = run_due_transitions(now)
+            if transitions and self.on_transitions:
+                self.on_transitions(transitions)
+
+            if now >= refresh_at:
+                self.load(now)
+                refresh_at = now + timedelta(seconds=self.refresh_interval)
+
+            self._stop.wait(self.next_wakeup(timezone.now(), refresh_at))
@@ -0,0 +1,168 @@
+import re
+import unicodedata
+
+from django.db.models import Q
+
+# Pesos per camp: una coincidència al títol val més que una a la descripció
+FIELD_WEIGHTS = {
+    'title': 5,
+    'tags': 3,
+    'description': 1,
+}
+MAX_TERM_WEIGHT = 50
+MAX_TERM_LENGTH = 64
+
+STOPWORDS = frozenset("""
+a al als amb de del dels el els en i la les lo los o per que un una uns unes
+es ha hi ho ja mes no se si son
+con e las le para por su sus y
+""".split())
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """
+    Lowercases the text and folds accents (à -> a, ç -> c, l·l -> ll).
+    """
+    text = (text or '').lower().replace('l·l', 'll').replace('l.l', 'll')
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """
+    Splits a text into normalized search terms, dropping stopwords.
+    """
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in _TOKEN_RE.findall(normalize(text))
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def build_terms(event):
+    """
+    Returns a {term: weight} dict for an event's title, tags and description.
+    """
+    terms = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(event, field)):
+            terms[token] = min(terms.get(token, 0) + weight, MAX_TERM_WEIGHT)
+    return terms
+
+
+def index_event(event):
+    """
+    Replaces the indexed terms of a single event.
+    """
+    from .models import SearchTerm
+
+    SearchTerm.objects.filter(event=event).delete()
+    SearchTerm.objects.bulk_create([
+        SearchTerm(event=event, term=term, weight=weight)
+        for term, weight in build_terms(event).items()
+    ])
+
+
+def rebuild_index(batch_size=1000, stdout=None):
+    """
+    Drops the whole index and rebuilds it from every event, in batches.
+    Returns the number of indexed events.
+    """
+    from .models import Event, SearchTerm
+
+    SearchTerm.objects.all().delete()
+    events = Event.objects.only('id', 'title', 'description', 'tags').order_by('pk')
+
+    count = 0
+    pending = []
+    for event in events.iterator(chunk_size=batch_size):
+        pending.extend(
+            SearchTerm(event_id=event.pk, term=term, weight=weight)
+            for term, weight in build_terms(event).items()
+        )
+        count += 1
+        if count % batch_size == 0:
+            SearchTerm.objects.bulk_create(pending, batch_size=batch_size)
+            pending = []
+            if stdout:
+                stdout.write(f'  {count} events indexed...')
+    SearchTerm.objects.bulk_create(pending, batch_size=batch_size)
+    return count
+
+
+def rank_matches(tokens):
+    """
+    Returns {event_id: rank} for the events with a term starting with every
+    token, where the rank adds up the weights of their matching terms.
+    """
+    from .models import SearchTerm
+
+    matches = Q()
+    for token in tokens:
+        matches |= Q(term__startswith=token)
+
+    ranks = {}
+    matched = {}
+    for event_id, term, weight in SearchTerm.objects.filter(matches).values_list('event_id', 'term', 'weight'):
+        ranks[event_id] = ranks.get(event_id, 0) + weight
+        matched.setdefault(event_id, set()).update(token for token in tokens if term.startswith(token))
+    return {event_id: rank for event_id, rank in ranks.items() if len(matched[event_id]) == len(tokens)}
+
+
+class RankedResults:
+    """
+    Search results in relevance order (then newest first). Only the ids are
+    kept in memory: slicing one page fetches just the rows of that page.
+    """
+
+    def __init__(self, queryset, ids):
+        self.queryset = queryset
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        rows = {_row_pk(row): row for row in self.queryset.filter(pk__in=ids)}
+        return [rows[pk] for pk in ids if pk in rows]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def values(self, *fields):
+        return RankedResults(self.queryset.values(*fields), self.ids)
+
+    def using(self, alias):
+        return RankedResults(self.queryset.using(alias), self.ids)
+
+    def iterator(self, chunk_size=2000):
+        for start in range(0, len(self.ids), chunk_size):
+            yield from self[start:start + chunk_size]
+
+
+def _row_pk(row):
+    return row['id'] if isinstance(row, dict) else row.pk
+
+
+def search_events(queryset, query):
+    """
+    Filters the queryset to events matching every term of the query (prefix
+    match, so partial words still work) and orders them by relevance.
+
+    The ranking is computed here instead of with a join and an aggregate,
+    which djongo cannot translate: one query reads the matching terms, a
+    second one applies the other filters of the queryset to those events.
+    """
+    tokens = set(tokenize(query))
+    if not tokens:
+        return queryset
+
+    ranks = rank_matches(tokens)
+    rows = queryset.filter(pk__in=list(ranks)).order_by().values_list('pk', 'created_at')
+    ids = [pk for pk, created_at in sorted(rows, key=lambda row: (ranks[row[0]], row[1]), reverse=True)]
+    return RankedResults(queryset, ids)
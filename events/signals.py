@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .caching import bump_version, invalidate_event
+from users.models import Follow
+
+from .feed import follow_creator, sync_event_timelines, unfollow_creator
+from .featured import invalidate_featured
+from .live import publish_status
+from .models import Event, EventQuerySet
+from .search import index_event
+from .tags import release_event_tags, sync_event_tags
+
+SEARCH_FIELDS = ('title', 'description', 'tags')
+
+
+@receiver(post_save, sender=Event)
+def update_search_index(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    if created or instance.has_changed(*SEARCH_FIELDS):
+        index_event(instance)
+
+
+@receiver(post_save, sender=Event)
+def update_tags(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'tags' not in update_fields:
+        return
+    if created or instance.has_changed('tags'):
+        sync_event_tags(instance)
+        bump_version('tags')
+
+
+@receiver(pre_delete, sender=Event)
+def release_tags(sender, instance, **kwargs):
+    release_event_tags(instance)
+    bump_version('tags')
+
+
+@receiver(post_save, sender=Event)
+def update_featured_cache(sender, instance, created, **kwargs):
+    was_featured = getattr(instance, '_loaded_values', {}).get('is_featured', False)
+    if not (instance.is_featured or was_featured):
+        return
+    card_fields = [name for name in EventQuerySet.CARD_FIELDS if name != 'id']
+    if created or instance.has_changed(*card_fields):
+        invalidate_featured()
+
+
+@receiver(post_delete, sender=Event)
+def clear_featured_cache(sender, instance, **kwargs):
+    if instance.is_featured:
+        invalidate_featured()
+
+
+@receiver(post_save, sender=Event)
+def announce_status(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'status' not in update_fields):
+        return
+    old_status = getattr(instance, '_loaded_values', {}).get('status')
+    if old_status is not None and old_status != instance.status:
+        pk, category, new_status = instance.pk, instance.category, instance.status
+        transaction.on_commit(lambda: publish_status(pk, category, old_status, new_status))
+
+
+@receiver(post_save, sender=Event)
+def update_timelines(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {'status', 'scheduled_date'} & set(update_fields):
+        return
+    if created or instance.has_changed('status', 'scheduled_date'):
+        pk = instance.pk
+        transaction.on_commit(lambda: sync_event_timelines(pk))
+
+
+@receiver(post_save, sender=Follow)
+def add_to_timeline(sender, instance, created, **kwargs):
+    if created:
+        follow_creator(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_from_timeline(sender, instance, **kwargs):
+    unfollow_creator(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=Event)
+def invalidate_pages(sender, instance, **kwargs):
+    old_category = getattr(instance, '_loaded_values', {}).get('category')
+    invalidate_event(instance, old_category=old_category)
+
+
+@receiver(post_delete, sender=Event)
+def invalidate_deleted_pages(sender, instance, **kwargs):
+    invalidate_event(instance)
@@ -0,0 +1,115 @@
+import re
+from collections import Counter
+
+from django.db.models import F
+
+MAX_TAG_LENGTH = 50
+POPULAR_TAGS_LIMIT = 10
+
+_SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_tag(name):
+    """
+    Lowercases a tag, drops a leading '#' and collapses inner whitespace.
+    """
+    name = _SPACES_RE.sub(' ', (name or '').strip().lstrip('#').strip().lower())
+    return name[:MAX_TAG_LENGTH]
+
+
+def parse_tags(text):
+    """
+    Splits a comma-separated tag string into unique normalized names,
+    keeping their original order.
+    """
+    names = []
+    for raw in (text or '').split(','):
+        name = normalize_tag(raw)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def sync_event_tags(event):
+    """
+    Brings event.normalized_tags in line with event.tags and adjusts the
+    event_count of every added or removed tag.
+    """
+    from .models import Tag
+
+    wanted = set(parse_tags(event.tags))
+    current = {tag.name: tag.pk for tag in event.normalized_tags.all()}
+
+    removed = [pk for name, pk in current.items() if name not in wanted]
+    if removed:
+        event.normalized_tags.remove(*removed)
+        Tag.objects.filter(pk__in=removed).update(event_count=F('event_count') - 1)
+
+    added = [Tag.objects.get_or_create(name=name)[0].pk for name in wanted - current.keys()]
+    if added:
+        event.normalized_tags.add(*added)
+        Tag.objects.filter(pk__in=added).update(event_count=F('event_count') + 1)
+
+
+def release_event_tags(event):
+    """
+    Decrements the counts of the tags of an event that is being deleted.
+    """
+    from .models import Tag
+
+    Tag.objects.filter(events=event).update(event_count=F('event_count') - 1)
+
+
+def popular_tags(limit=POPULAR_TAGS_LIMIT):
+    """
+    Returns the most used tags as (name, count) pairs: a single read of the
+    first `limit` entries of the popularity index.
+    """
+    from .models import Tag
+
+    return list(
+        Tag.objects.filter(event_count__gt=0)
+        .order_by('-event_count', 'name')
+        .values_list('name', 'event_count')[:limit]
+    )
+
+
+def backfill_tags(batch_size=1000, stdout=None):
+    """
+    Rebuilds the normalized tags of every event from their `tags` string and
+    recomputes all counts. Returns (events processed, distinct tags).
+    """
+    from .models import Event, Tag
+
+    Through = Event.normalized_tags.through
+    Through.objects.all().delete()
+
+    tag_ids = dict(Tag.objects.values_list('name', 'pk'))
+    counts = Counter()
+    pending = []
+    processed = 0
+
+    events = Event.objects.only('id', 'tags').order_by('pk')
+    for event in events.iterator(chunk_size=batch_size):
+        names = parse_tags(event.tags)
+        missing = [name for name in names if name not in tag_ids]
+        if missing:
+            Tag.objects.bulk_create([Tag(name=name) for name in missing])
+            tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'pk'))
+        for name in names:
+            pending.append(Through(event_id=event.pk, tag_id=tag_ids[name]))
+            counts[name] += 1
+
+        processed += 1
+        if processed % batch_size == 0:
+            Through.objects.bulk_create(pending, batch_size=batch_size)
+            pending = []
+            if stdout:
+                stdout.write(f'  {processed} events processed...')
+    Through.objects.bulk_create(pending, batch_size=batch_size)
+
+    tags = list(Tag.objects.all())
+    for tag in tags:
+        tag.event_count = counts.get(tag.name, 0)
+    Tag.objects.bulk_update(tags, ['event_count'], batch_size=batch_size)
+    return processed, len(counts)
@@ -1,3 +1,863 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from users.models import Follow
+
+from . import caching, scheduler
+from .feed import get_feed, rebuild_timelines
+from .forms import DUPLICATE_TITLE_ERROR
+from .models import Event, Tag, TimelineEntry
+from .pagination import CursorPaginator, decode_cursor, encode_cursor
+from .providers import backfill_stream_embeds, match_stream
+from .querybudget import QueryBudgetExceeded, assert_max_queries
+from .search import search_events
+from .thumbnails import RENDITIONS, rendition_name
+
+User = get_user_model()
+
+
+def create_event(creator, number, **kwargs):
+    defaults = {
+        'title': f'Esdeveniment {number}',
+        'description': f'Descripció de l\'esdeveniment {number}',
+        'category': 'gaming',
+        'status': 'scheduled',
+        'scheduled_date': timezone.now() + timedelta(days=number),
+        'duration': timedelta(hours=1),
+        'tags': 'minecraft, speedrun',
+        'creator': creator,
+    }
+    defaults.update(kwargs)
+    return Event.objects.create(**defaults)
+
+
+def event_form_data(**kwargs):
+    data = {
+        'title': 'Títol nou',
+        'description': 'Descripció',
+        'category': 'gaming',
+        'scheduled_date': (timezone.localtime() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M'),
+        'duration': '01:00:00',
+        'max_viewers': 100,
+        'tags': '',
+        'stream_url': '',
+    }
+    data.update(kwargs)
+    return data
+
+
+class EventTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('creador', 'creador@streamevents.com', 'password123')
+        cls.events = [create_event(cls.creator, number) for number in range(1, 31)]
+
+    def setUp(self):
+        # Pàgines, versions i comptadors en memòria cau no han de passar d'un test a l'altre
+        cache.clear()
+
+
+@override_settings(QUERY_BUDGETS_ENFORCED=True, EVENTS_PAGE_CACHE_TIMEOUT=0)
+class QueryBudgetTests(EventTestCase):
+    """
+    The @query_budget of each view fails the request (QueryBudgetExceeded)
+    when the view runs more queries than declared.
+    """
+
+    def test_event_list(self):
+        self.assertEqual(self.client.get(reverse('events:event_list')).status_code, 200)
+
+    def test_event_list_filtered_and_searched(self):
+        response = self.client.get(reverse('events:event_list'), {'category': 'gaming', 'search': 'esdeveniment'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_list_next_page(self):
+        page = self.client.get(reverse('events:event_list')).context['page_obj']
+        response = self.client.get(reverse('events:event_list'), {'after': page.next_cursor})
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_detail(self):
+        response = self.client.get(reverse('events:event_detail', args=[self.events[0].pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_events_by_category(self):
+        response = self.client.get(reverse('events:events_by_category', args=['gaming']))
+        self.assertEqual(response.status_code, 200)
+
+    def test_my_events(self):
+        self.client.force_login(self.creator)
+        self.assertEqual(self.client.get(reverse('events:my_events')).status_code, 200)
+
+    def test_budget_is_enforced(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_max_queries(0):
+                list(Event.objects.all())
+
+
+class CursorPaginationTests(EventTestCase):
+    """
+    Keyset pages over (-created_at, -pk): stable when rows share created_at,
+    and a tampered or invalid cursor falls back to the first page.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Tots a la mateixa data: només el pk desempata
+        Event.objects.update(created_at=timezone.now())
+        self.paginator = CursorPaginator(Event.objects.all(), 7)
+
+    def walk_forward(self):
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(after=pages[-1].next_cursor))
+        return pages
+
+    def test_ties_on_created_at(self):
+        pages = self.walk_forward()
+        pks = [event.pk for page in pages for event in page]
+        self.assertEqual(pks, sorted((event.pk for event in self.events), reverse=True))
+        self.assertEqual([len(page) for page in pages], [7, 7, 7, 7, 2])
+
+    def test_back_and_forth(self):
+        pages = self.walk_forward()
+        previous = self.paginator.get_page(before=pages[2].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        self.assertTrue(previous.has_next() and previous.has_previous())
+        first = self.paginator.get_page(before=pages[1].previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_new_rows_do_not_shift_the_next_page(self):
+        first = self.paginator.get_page()
+        second = list(self.paginator.get_page(after=first.next_cursor))
+        create_event(self.creator, 100, title='Nou')
+        self.assertEqual(list(self.paginator.get_page(after=first.next_cursor)), second)
+
+    def test_invalid_cursors(self):
+        tampered = [
+            'no-és-un-cursor',
+            '!!!',
+            encode_cursor(self.events[0])[:-3],
+            base64_cursor('2025-01-15T10:00:00|no-és-un-pk'),
+            base64_cursor('no-és-una-data|5'),
+            base64_cursor('sense separador'),
+            base64_cursor('\udcff'),
+        ]
+        first = list(self.paginator.get_page())
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                self.assertEqual(list(self.paginator.get_page(after=cursor)), first)
+                self.assertEqual(list(self.paginator.get_page(before=cursor)), first)
+
+    def test_invalid_cursor_in_the_views(self):
+        self.assertEqual(self.client.get(reverse('events:event_list'), {'after': '!!!'}).status_code, 200)
+        self.assertEqual(self.client.get(reverse('events:api_event_list'), {'before': 'x|y'}).status_code, 200)
+
+
+def base64_cursor(raw):
+    return base64.urlsafe_b64encode(raw.encode('utf-8', 'surrogatepass')).decode().rstrip('=')
+
+
+class SearchTests(TestCase):
+    """
+    search_events keeps the events with a term starting with every word of
+    the query and orders them by the weight of their matching terms.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        creator = User.objects.create_user('creador', 'creador@streamevents.com', 'password123')
+        cls.in_title = create_event(creator, 1, title='Torneig de Minecraft', description='Partides', tags='')
+        cls.in_tags = create_event(creator, 2, title='Nit de jocs', description='Partides', tags='minecraft')
+        cls.in_description = create_event(creator, 3, title='Xerrada', description='Parlem de Minecraft', tags='')
+        cls.unrelated = create_event(creator, 4, title='Concert de jazz', description='Música', tags='', category='music')
+
+    def search(self, query, queryset=None):
+        return list(search_events(queryset or Event.objects.all(), query))
+
+    def test_ranks_by_field_weight(self):
+        self.assertEqual(self.search('minecraft'), [self.in_title, self.in_tags, self.in_description])
+
+    def test_prefix_and_accents(self):
+        self.assertEqual(self.search('MINEC'), [self.in_title, self.in_tags, self.in_description])
+        self.assertEqual(self.search('musica'), [self.unrelated])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('minecraft partides'), [self.in_title, self.in_tags])
+        self.assertEqual(self.search('minecraft jazz'), [])
+
+    def test_ties_are_newest_first(self):
+        newer = create_event(self.in_title.creator, 5, title='Minecraft', description='', tags='')
+        older = create_event(self.in_title.creator, 6, title='Minecraft!', description='', tags='')
+        Event.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.search('minecraft')[:3], [newer, self.in_title, older])
+
+    def test_keeps_the_queryset_filters(self):
+        self.assertEqual(self.search('minecraft', Event.objects.filter(title__startswith='Nit')), [self.in_tags])
+        self.assertEqual(self.search('de', Event.objects.all()), list(Event.objects.all()))
+
+    def test_exports_in_rank_order(self):
+        response = self.client.get(reverse('events:api_event_export'), {'search': 'minecraft', 'fields': 'id'})
+        ids = [json.loads(line)['id'] for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(ids, [self.in_title.pk, self.in_tags.pk, self.in_description.pk])
+
+    def test_paginates_in_rank_order(self):
+        response = self.client.get(reverse('events:event_list'), {'search': 'minecraft'})
+        self.assertEqual(list(response.context['page_obj']), [self.in_title, self.in_tags, self.in_description])
+
+
+@override_settings(EVENTS_PAGE_CACHE_TIMEOUT=300)
+class PageCacheTests(EventTestCase):
+    """
+    Anonymous pages are served from the versioned page cache and rebuilt as
+    soon as an event they show changes.
+    """
+
+    def test_cached_page_runs_no_queries(self):
+        url = reverse('events:event_detail', args=[self.events[0].pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_detail_is_invalidated_on_save(self):
+        event = self.events[0]
+        url = reverse('events:event_detail', args=[event.pk])
+        self.assertContains(self.client.get(url), event.title)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            event.title = 'Títol actualitzat'
+            event.save()
+
+        self.assertContains(self.client.get(url), 'Títol actualitzat')
+
+    def test_list_is_invalidated_on_create_and_delete(self):
+        url = reverse('events:event_list')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            event = create_event(self.creator, 0, title='Nou esdeveniment', scheduled_date=timezone.now())
+        self.assertContains(self.client.get(url), 'Nou esdeveniment')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            event.delete()
+        self.assertNotContains(self.client.get(url), 'Nou esdeveniment')
+
+    def test_authenticated_users_skip_the_cache(self):
+        url = reverse('events:event_detail', args=[self.events[0].pk])
+        self.client.get(url)
+        Event.objects.filter(pk=self.events[0].pk).update(title='Canvi sense senyals')
+
+        self.assertNotContains(self.client.get(url), 'Canvi sense senyals')
+        self.client.force_login(self.creator)
+        self.assertContains(self.client.get(url), 'Canvi sense senyals')
+
+
+class DuplicateTitleTests(EventTestCase):
+    """
+    A creator cannot have two events with the same title: the forms reject
+    it and the (creator, title) unique constraint backs them up.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.creator)
+
+    def test_create_with_duplicate_title(self):
+        response = self.client.post(reverse('events:event_create'), event_form_data(title=self.events[0].title))
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'title', DUPLICATE_TITLE_ERROR)
+        self.assertEqual(Event.objects.filter(creator=self.creator, title=self.events[0].title).count(), 1)
+
+    def test_update_to_duplicate_title(self):
+        event = self.events[1]
+        data = event_form_data(title=self.events[0].title, status=event.status)
+        response = self.client.post(reverse('events:event_update', args=[event.pk]), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'title', DUPLICATE_TITLE_ERROR)
+        event.refresh_from_db()
+        self.assertEqual(event.title, 'Esdeveniment 2')
+
+    def test_update_keeping_its_own_title(self):
+        event = self.events[1]
+        data = event_form_data(title=event.title, status=event.status, description='Nova descripció')
+        response = self.client.post(reverse('events:event_update', args=[event.pk]), data)
+        self.assertRedirects(response, reverse('events:event_detail', args=[event.pk]), fetch_redirect_response=False)
+
+    def test_other_creators_can_reuse_the_title(self):
+        self.client.force_login(User.objects.create_user('altre', 'altre@streamevents.com', 'password123'))
+        response = self.client.post(reverse('events:event_create'), event_form_data(title=self.events[0].title))
+        self.assertEqual(response.status_code, 302)
+
+    def test_constraint_catches_a_concurrent_duplicate(self):
+        # Dues peticions simultànies passen la comprovació del formulari abans de desar
+        with mock.patch('events.forms.title_taken', return_value=False):
+            response = self.client.post(reverse('events:event_create'), event_form_data(title=self.events[0].title))
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'title', DUPLICATE_TITLE_ERROR)
+
+
+class SchedulerTests(TestCase):
+    """
+    run_due_transitions moves due events scheduled -> live -> finished, in
+    keyset batches, and only reports the rows this run moved.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('creador', 'creador@streamevents.com', 'password123')
+
+    def setUp(self):
+        cache.clear()
+
+    def event(self, number, starts_in, **kwargs):
+        return create_event(self.creator, number, scheduled_date=timezone.now() + starts_in, **kwargs)
+
+    def statuses(self):
+        return dict(Event.objects.values_list('title', 'status'))
+
+    def test_transitions(self):
+        self.event(1, timedelta(minutes=-5))
+        self.event(2, timedelta(hours=-2))
+        self.event(3, timedelta(hours=-2), status='live')
+        self.event(4, timedelta(hours=1))
+
+        transitions = scheduler.run_due_transitions()
+
+        titles = dict(Event.objects.values_list('pk', 'title'))
+        self.assertEqual(sorted((titles[pk], old, new) for pk, category, featured, old, new in transitions), [
+            ('Esdeveniment 1', 'scheduled', 'live'),
+            # Ja ha acabat: passa pels dos estats a la mateixa passada
+            ('Esdeveniment 2', 'live', 'finished'),
+            ('Esdeveniment 2', 'scheduled', 'live'),
+            ('Esdeveniment 3', 'live', 'finished'),
+        ])
+        self.assertEqual(self.statuses(), {
+            'Esdeveniment 1': 'live',
+            'Esdeveniment 2': 'finished',
+            'Esdeveniment 3': 'finished',
+            'Esdeveniment 4': 'scheduled',
+        })
+
+    def test_runs_again_without_changes(self):
+        self.event(1, timedelta(minutes=-5))
+        scheduler.run_due_transitions()
+        updated_at = Event.objects.get().updated_at
+        self.assertEqual(scheduler.run_due_transitions(), [])
+        self.assertEqual(Event.objects.get().updated_at, updated_at)
+
+    def test_keyset_batches(self):
+        start = timezone.now() - timedelta(minutes=30)
+        # Dos esdeveniments comparteixen data: el pk desempata entre lots
+        for number, minutes in enumerate([0, 1, 1, 2, 3]):
+            create_event(self.creator, number, scheduled_date=start + timedelta(minutes=minutes))
+        with mock.patch.object(scheduler, 'BATCH_SIZE', 2):
+            batches = list(scheduler.due_batches('scheduled', 'scheduled_date', timezone.now()))
+            self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+            self.assertEqual(len({row[0] for batch in batches for row in batch}), 5)
+            self.assertEqual(len(scheduler.run_due_transitions()), 5)
+        self.assertEqual(set(self.statuses().values()), {'live'})
+
+    def test_concurrent_instance(self):
+        ours = self.event(1, timedelta(minutes=-5))
+        theirs = self.event(2, timedelta(minutes=-5))
+        update = QuerySet.update
+        raced = []
+
+        def racing_update(queryset, **kwargs):
+            # Una altra instància mou un dels esdeveniments entre la lectura i l'actualització
+            if not raced:
+                raced.append(True)
+                update(Event.objects.filter(pk=theirs.pk), status='live', updated_at=timezone.now() - timedelta(seconds=1))
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=racing_update):
+            transitions = scheduler.run_due_transitions()
+
+        self.assertEqual([pk for pk, category, featured, old, new in transitions], [ours.pk])
+        self.assertEqual(set(self.statuses().values()), {'live'})
+
+
+class ApiTests(EventTestCase):
+    """
+    JSON API: field projection, ETag revalidation, JSON errors and the
+    streamed NDJSON export.
+    """
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'events:{name}', args=args), params)
+
+    def test_list(self):
+        data = self.get('api_event_list', limit=10).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+        self.assertEqual(data['results'][0]['url'], reverse('events:event_detail', args=[self.events[-1].pk]))
+        self.assertEqual(data['results'][0]['tags'], ['minecraft', 'speedrun'])
+
+    def test_fields_projection(self):
+        data = self.get('api_event_list', fields='id,title', limit=2).json()
+        self.assertEqual([set(row) for row in data['results']], [{'id', 'title'}] * 2)
+        self.assertEqual(set(self.get('api_event_detail', self.events[0].pk, fields='creator').json()), {'creator'})
+
+    def test_unknown_field(self):
+        response = self.get('api_event_list', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Unknown fields: password'})
+
+    def test_not_modified(self):
+        event = self.events[0]
+        response = self.get('api_event_detail', event.pk)
+        etag = response['ETag']
+        response = self.client.get(reverse('events:api_event_detail', args=[event.pk]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        event.title = 'Títol canviat'
+        event.save()
+        response = self.client.get(reverse('events:api_event_detail', args=[event.pk]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified(self):
+        url = reverse('events:api_event_list')
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        create_event(self.creator, 100)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_the_fields(self):
+        pk = self.events[0].pk
+        url = reverse('events:api_event_detail', args=[pk])
+        etag = self.get('api_event_detail', pk, fields='id')['ETag']
+        self.assertNotEqual(self.get('api_event_detail', pk, fields='id,title')['ETag'], etag)
+        # Una còpia amb menys camps no es pot revalidar per a una altra projecció
+        self.assertEqual(self.client.get(url, {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertNotEqual(self.get('api_event_list', fields='id', limit=100)['ETag'], self.get('api_event_list', limit=100)['ETag'])
+
+    def test_not_found(self):
+        response = self.get('api_event_detail', 999999)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Event not found.'})
+
+        response = self.get('api_event_list', search='esdeveniment', page=99)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
+
+    def test_export(self):
+        response = self.get('api_event_export', fields='id,title', category='gaming')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows[0], {'id': self.events[-1].pk, 'title': self.events[-1].title})
+        self.assertEqual(len(rows), len(self.events))
+
+    def test_export_bad_request(self):
+        self.assertEqual(self.get('api_event_export', category='no-existeix').status_code, 400)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class GetOrComputeTests(TestCase):
+    """
+    get_or_compute with a fake clock and a fixed XFetch draw: single-flight
+    recomputation, stale values while another worker recomputes, early
+    refresh and the bounded wait on a cold miss.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        patcher = mock.patch.object(caching, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Sorteig de l'XFetch fix: amb 0 mai es refresca abans d'hora
+        draw = mock.patch.object(caching.random, 'random', return_value=0.0)
+        draw.start()
+        self.addCleanup(draw.stop)
+        self.calls = 0
+
+    def compute(self, value='nou'):
+        def compute():
+            self.calls += 1
+            self.clock.now += 0.5
+            return value
+        return compute
+
+    def get(self, compute=None, version=1, timeout=60):
+        return caching.get_or_compute('clau', compute or self.compute(), timeout, version=version)
+
+    def lock_elsewhere(self):
+        cache.add('clau:lock', 1, caching.LOCK_TIMEOUT)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self.get(), 'nou')
+        self.assertEqual(self.get(self.compute('altre')), 'nou')
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(cache.get('clau:lock'))
+
+    def test_none_is_not_stored(self):
+        self.assertIsNone(self.get(self.compute(None)))
+        self.assertEqual(self.get(), 'nou')
+        self.assertEqual(self.calls, 2)
+
+    def test_stale_value_while_another_worker_recomputes(self):
+        self.get(self.compute('vell'))
+        self.clock.now += 61
+        self.lock_elsewhere()
+        self.assertEqual(self.get(), 'vell')
+        self.assertEqual(self.calls, 1)
+        # Quan s'allibera el bloqueig, el primer que arriba el recalcula
+        cache.delete('clau:lock')
+        self.assertEqual(self.get(), 'nou')
+        self.assertEqual(self.calls, 2)
+
+    def test_new_version_is_rebuilt_by_one_worker(self):
+        self.get(self.compute('v1'))
+        self.lock_elsewhere()
+        self.assertEqual(self.get(version=2), 'v1')
+        cache.delete('clau:lock')
+        self.assertEqual(self.get(self.compute('v2'), version=2), 'v2')
+        self.assertEqual(self.get(version=2), 'v2')
+
+    def test_early_refresh(self):
+        self.get(self.compute('vell'))
+        self.clock.now += 59
+        self.assertEqual(self.get(), 'vell')
+        # Sorteig desfavorable: delta (0,5 s) * -log(1 - r) supera el segon que queda
+        with mock.patch.object(caching.random, 'random', return_value=0.99):
+            self.assertEqual(self.get(), 'nou')
+            self.lock_elsewhere()
+            self.clock.now += 0.1
+            self.assertEqual(self.get(self.compute('no')), 'nou')
+        self.assertEqual(self.calls, 2)
+
+    def test_cold_miss_waits_for_the_other_worker(self):
+        self.lock_elsewhere()
+        sleep = self.clock.sleep
+
+        def sleep_and_store(seconds):
+            sleep(seconds)
+            if self.clock.now >= 1000.2:
+                cache.set('clau', ('de l\'altre', self.clock.now + 60, 0.5, 1), 60)
+
+        self.clock.sleep = sleep_and_store
+        self.assertEqual(self.get(), "de l'altre")
+        self.assertEqual(self.calls, 0)
+
+    def test_cold_miss_wait_is_bounded(self):
+        self.lock_elsewhere()
+        self.assertEqual(self.get(), 'nou')
+        self.assertEqual(self.calls, 1)
+        waited = self.clock.now - 1000 - 0.5
+        self.assertLessEqual(waited, caching.LOCK_WAIT + caching.WAIT_INTERVAL)
+        self.assertLess(caching.LOCK_WAIT, caching.LOCK_TIMEOUT)
+
+
+class MediaStorageTests(TestCase):
+    """
+    Content-addressed uploads are stored once, and gc_media only deletes
+    old files that no event or user references (renditions included).
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_setting = override_settings(MEDIA_ROOT=self.media_root)
+        media_setting.enable()
+        self.addCleanup(media_setting.disable)
+
+    def save(self, name, content):
+        return default_storage.save(name, ContentFile(content))
+
+    def write_rendition(self, thumbnail, rendition):
+        # Com render_renditions: directament al disc, amb el nom derivat del de la miniatura
+        name = rendition_name(thumbnail, rendition)
+        os.makedirs(os.path.dirname(default_storage.path(name)), exist_ok=True)
+        with open(default_storage.path(name), 'wb') as file:
+            file.write(rendition.encode())
+        return name
+
+    def age(self, name, seconds=7200):
+        path = default_storage.path(name)
+        past = os.stat(path).st_mtime - seconds
+        os.utime(path, (past, past))
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self.save('events/thumbnails/portada.PNG', b'mateix contingut')
+        second = self.save('events/thumbnails/una-altra.png', b'mateix contingut')
+        digest = hashlib.sha256(b'mateix contingut').hexdigest()
+        self.assertEqual(first, f'events/thumbnails/{digest[:2]}/{digest}.png')
+        self.assertEqual(second, first)
+        self.assertEqual(len(os.listdir(os.path.dirname(default_storage.path(first)))), 1)
+        self.assertNotEqual(self.save('events/thumbnails/portada.png', b'un altre contingut'), first)
+
+    def test_gc_media(self):
+        creator = User.objects.create_user('creador', 'creador@streamevents.com', 'password123')
+        thumbnail = self.save('events/thumbnails/portada.png', b'portada')
+        renditions = [self.write_rendition(thumbnail, rendition) for rendition in RENDITIONS]
+        Event.objects.filter(pk=create_event(creator, 1).pk).update(thumbnail=thumbnail)
+        avatar = self.save('avatars/foto.png', b'avatar')
+        User.objects.filter(pk=creator.pk).update(avatar=avatar)
+        orphan = self.save('events/thumbnails/antiga.png', b'antiga')
+        orphan_rendition = self.write_rendition(orphan, 'card')
+        recent = self.save('avatars/nova.png', b'pujada en curs')
+        for name in [thumbnail, *renditions, avatar, orphan, orphan_rendition]:
+            self.age(name)
+
+        output = io.StringIO()
+        call_command('gc_media', dry_run=True, stdout=output)
+        self.assertIn('Would delete 2 unreferenced files', output.getvalue())
+        self.assertTrue(default_storage.exists(orphan))
+
+        call_command('gc_media', stdout=io.StringIO())
+        for name in [thumbnail, *renditions, avatar, recent]:
+            self.assertTrue(default_storage.exists(name), name)
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertFalse(default_storage.exists(orphan_rendition))
+
+
+def png(width=2, height=2):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height)).save(output, 'PNG')
+    return output.getvalue()
+
+
+class UploadTests(EventTestCase):
+    """
+    ImageUploadHandler refuses oversized, non-image and undecodable uploads
+    while streaming them, and both the site and the admin forms show why.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.creator)
+
+    def upload(self, content, name='portada.png'):
+        data = event_form_data(thumbnail=SimpleUploadedFile(name, content, content_type='image/png'))
+        return self.client.post(reverse('events:event_create'), data)
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(message, response.context['form'].errors['thumbnail'][0])
+        self.assertFalse(Event.objects.filter(title='Títol nou').exists())
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=100)
+    def test_oversized(self):
+        self.assertRejected(self.upload(png() + b'\0' * 200), 'La imatge no pot superar')
+
+    def test_bad_magic_bytes(self):
+        self.assertRejected(self.upload(b'MZ\x90\x00' + b'\0' * 100, 'portada.exe'), 'no és una imatge')
+
+    def test_undecodable(self):
+        self.assertRejected(self.upload(b'\x89PNG\r\n\x1a\n' + b'brossa' * 20), "No s'ha pogut llegir")
+
+    @override_settings(MAX_IMAGE_PIXELS=50 * 50)
+    def test_too_many_pixels(self):
+        self.assertRejected(self.upload(png(100, 100)), 'La imatge és massa gran (100×100 píxels).')
+
+    def test_admin_shows_the_upload_error(self):
+        admin = User.objects.create_superuser('admin', 'admin@streamevents.com', 'password123')
+        self.client.force_login(admin)
+        data = event_form_data(
+            creator=self.creator.pk, status='scheduled', scheduled_date_0='2030-01-01', scheduled_date_1='10:00',
+            thumbnail=SimpleUploadedFile('portada.png', b'no es una imatge', content_type='image/png'),
+        )
+        response = self.client.post(reverse('admin:events_event_add'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'El fitxer no és una imatge JPEG, PNG, GIF o WebP.')
+        self.assertNotContains(response, 'The submitted file is empty.')
+
+
+class TagCountTests(TestCase):
+    """
+    Tag.event_count follows the events that use each tag as they are
+    created, edited and deleted.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('creador', 'creador@streamevents.com', 'password123')
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        return dict(Tag.objects.values_list('name', 'event_count'))
+
+    def test_add(self):
+        create_event(self.creator, 1, tags='Minecraft, #speedrun')
+        create_event(self.creator, 2, tags='minecraft,  MINECRAFT ')
+        self.assertEqual(self.counts(), {'minecraft': 2, 'speedrun': 1})
+
+    def test_edit(self):
+        event = create_event(self.creator, 1, tags='minecraft, speedrun')
+        event.tags = 'speedrun, retro'
+        event.save()
+        self.assertEqual(self.counts(), {'minecraft': 0, 'speedrun': 1, 'retro': 1})
+        self.assertEqual(set(event.normalized_tags.values_list('name', flat=True)), {'speedrun', 'retro'})
+
+    def test_delete(self):
+        kept = create_event(self.creator, 1, tags='minecraft')
+        create_event(self.creator, 2, tags='minecraft, speedrun').delete()
+        self.assertEqual(self.counts(), {'minecraft': 1, 'speedrun': 0})
+        kept.delete()
+        self.assertEqual(self.counts(), {'minecraft': 0, 'speedrun': 0})
+
+    def test_unrelated_save_keeps_the_counts(self):
+        event = create_event(self.creator, 1, tags='minecraft')
+        event.title = 'Un altre títol'
+        event.save()
+        event.save(update_fields=['title'])
+        self.assertEqual(self.counts(), {'minecraft': 1})
+
+
+@override_settings(STREAM_EMBED_PARENTS=['streamevents.com'])
+class StreamProviderTests(TestCase):
+    """
+    match_stream recognises each provider's URL shapes; the result is
+    stored on save and refreshed by backfill_stream_embeds.
+    """
+
+    def test_providers(self):
+        cases = [
+            ('https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10', 'youtube', 'dQw4w9WgXcQ',
+             'https://www.youtube.com/embed/dQw4w9WgXcQ'),
+            ('youtu.be/dQw4w9WgXcQ', 'youtube', 'dQw4w9WgXcQ', 'https://www.youtube.com/embed/dQw4w9WgXcQ'),
+            ('https://m.youtube.com/live/dQw4w9WgXcQ', 'youtube', 'dQw4w9WgXcQ',
+             'https://www.youtube.com/embed/dQw4w9WgXcQ'),
+            ('https://www.twitch.tv/videos/123456', 'twitch_video', '123456',
+             'https://player.twitch.tv/?video=123456&parent=streamevents.com'),
+            ('https://TWITCH.tv/Canal_1', 'twitch', 'Canal_1',
+             'https://player.twitch.tv/?channel=Canal_1&parent=streamevents.com'),
+            ('https://vimeo.com/76979871', 'vimeo', '76979871', 'https://player.vimeo.com/video/76979871'),
+            ('https://player.vimeo.com/video/76979871', 'vimeo', '76979871', 'https://player.vimeo.com/video/76979871'),
+            ('https://kick.com/canal-1', 'kick', 'canal-1', 'https://player.kick.com/canal-1'),
+        ]
+        for url, *expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(match_stream(url), tuple(expected))
+
+    def test_unknown_and_empty(self):
+        self.assertEqual(match_stream('https://exemple.com/directe'), ('', '', 'https://exemple.com/directe'))
+        self.assertEqual(match_stream(''), ('', '', ''))
+
+    def test_stored_on_save_and_backfilled(self):
+        creator = User.objects.create_user('creador', 'creador@streamevents.com', 'password123')
+        event = create_event(creator, 1, stream_url='https://vimeo.com/76979871')
+        self.assertEqual(
+            (event.stream_provider, event.stream_ref, event.stream_embed_url),
+            ('vimeo', '76979871', 'https://player.vimeo.com/video/76979871'),
+        )
+        Event.objects.filter(pk=event.pk).update(stream_provider='', stream_ref='', stream_embed_url='')
+        self.assertEqual(backfill_stream_embeds(), (1, 1))
+        event.refresh_from_db()
+        self.assertEqual(event.stream_provider, 'vimeo')
+        self.assertEqual(backfill_stream_embeds(), (1, 0))
+
+
+class FeedTests(TestCase):
+    """
+    Fan-out on write: active events of followed creators are copied to the
+    followers' timelines and removed when they finish or are deleted;
+    popular creators are read at request time instead.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('creador', 'creador@streamevents.com', 'password123')
+        cls.follower = User.objects.create_user('seguidor', 'seguidor@streamevents.com', 'password123')
+        cls.other = User.objects.create_user('altre', 'altre@streamevents.com', 'password123')
+        Follow.objects.create(follower=cls.follower, following=cls.creator)
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, number, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_event(self.creator, number, **kwargs)
+
+    def timeline(self, user=None):
+        return list(TimelineEntry.objects.filter(user=user or self.follower).values_list('event_id', flat=True))
+
+    def test_fanout_on_create(self):
+        event = self.create(1)
+        self.assertEqual(self.timeline(), [event.pk])
+        self.assertEqual(self.timeline(self.other), [])
+        self.assertEqual(get_feed(self.follower), [event])
+
+    def test_inactive_events_are_not_copied(self):
+        self.create(1, status='finished')
+        self.create(2, status='cancelled')
+        self.assertEqual(self.timeline(), [])
+
+    def test_removed_when_finished_or_deleted(self):
+        finished, deleted = self.create(1), self.create(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            finished.status = 'finished'
+            finished.save()
+        self.assertEqual(self.timeline(), [deleted.pk])
+        deleted.delete()
+        self.assertEqual(self.timeline(), [])
+
+    def test_scheduler_removes_finished_events(self):
+        event = self.create(1, status='live', scheduled_date=timezone.now() - timedelta(hours=2))
+        self.assertEqual(self.timeline(), [event.pk])
+        scheduler.run_due_transitions()
+        self.assertEqual(self.timeline(), [])
+
+    def test_reschedule_updates_the_entry(self):
+        event = self.create(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            event.scheduled_date = timezone.now() + timedelta(days=10)
+            event.save()
+        self.assertEqual(TimelineEntry.objects.get(event=event).scheduled_date, event.scheduled_date)
+
+    def test_follow_and_unfollow(self):
+        event = self.create(1)
+        follow = Follow.objects.create(follower=self.other, following=self.creator)
+        self.assertEqual(self.timeline(self.other), [event.pk])
+        follow.delete()
+        self.assertEqual(self.timeline(self.other), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_creators_are_read_at_request_time(self):
+        event = self.create(1)
+        self.assertEqual(self.timeline(), [])
+        self.assertEqual(get_feed(self.follower), [event])
+        self.assertEqual(get_feed(self.other), [])
+
+    def test_rebuild_timelines(self):
+        events = [self.create(number) for number in (1, 2)]
+        TimelineEntry.objects.all().delete()
+        self.assertEqual(rebuild_timelines(), 2)
+        self.assertEqual(sorted(self.timeline()), [event.pk for event in events])
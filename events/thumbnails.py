@@ -0,0 +1,156 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+
+from config.metrics import counter, histogram
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# nom: (amplada, alçada, format)
+RENDITIONS = {
+    'card': (480, 270, 'JPEG'),
+    'card_webp': (480, 270, 'WEBP'),
+    'detail': (1280, 720, 'JPEG'),
+    'detail_webp': (1280, 720, 'WEBP'),
+}
+RENDITIONS_DIR = 'events/thumbnails/renditions/'
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 0.5
+
+RENDITION_JOBS = counter('thumbnail_rendition_jobs_total', 'Thumbnail rendition jobs by result.', ('result',))
+RENDER_DURATION = histogram('thumbnail_render_seconds', 'Time spent rendering the renditions of a thumbnail.')
+# Des que Event.save() encua la feina fins que les renditions estan llestes
+RENDITIONS_LATENCY = histogram(
+    'thumbnail_renditions_latency_seconds', 'Time from queueing a thumbnail until its renditions are ready.',
+)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def rendition_name(name, rendition):
+    """
+    Returns the storage name of a rendition of the thumbnail `name`.
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    extension = EXTENSIONS[RENDITIONS[rendition][2]]
+    return f'{RENDITIONS_DIR}{stem}_{rendition}.{extension}'
+
+
+def rendition_urls(name):
+    return {rendition: default_storage.url(rendition_name(name, rendition)) for rendition in RENDITIONS}
+
+
+def render_renditions(source, media_root, name):
+    """
+    Writes every rendition of the image at `source`. Runs in a worker
+    process, so it only touches the filesystem (never the database).
+    Transient I/O errors are retried; returns the processing time.
+    """
+    start = time.monotonic()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            with Image.open(source) as img:
+                # draft() deixa que el descodificador JPEG redueixi mentre llegeix
+                img.draft('RGB', (1280, 720))
+                img = img.convert('RGB')
+                for rendition, (width, height, image_format) in RENDITIONS.items():
+                    target = os.path.join(media_root, rendition_name(name, rendition))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    copy = img.copy()
+                    copy.thumbnail((width, height), Image.LANCZOS)
+                    tmp = f'{target}.{os.getpid()}.tmp'
+                    copy.save(tmp, image_format, **SAVE_OPTIONS[image_format])
+                    os.replace(tmp, target)
+            return time.monotonic() - start
+        except OSError:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            time.sleep(RETRY_DELAY * attempt)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS)
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def mark_ready(pk, category, name):
+    """
+    Flags the renditions as available, unless the thumbnail changed meanwhile.
+    """
+    from .caching import bump_version
+    from .models import Event
+
+    if Event.objects.filter(pk=pk, thumbnail=name).update(renditions_ready=True):
+        bump_version('list', f'event:{pk}', f'category:{category}')
+
+
+def _on_done(pk, category, name, queued_at, future):
+    try:
+        RENDER_DURATION.observe(future.result())
+        mark_ready(pk, category, name)
+        RENDITION_JOBS.inc(result='ok')
+        RENDITIONS_LATENCY.observe(time.monotonic() - queued_at)
+    except Exception:
+        RENDITION_JOBS.inc(result='error')
+        logger.exception('Could not generate the renditions of event %s (%s)', pk, name)
+    finally:
+        # El callback s'executa en un fil del pool: tanquem la seva connexió
+        connection.close()
+
+
+def schedule_renditions(event):
+    """
+    Queues the rendition of an event thumbnail in the process pool (or runs
+    it inline when THUMBNAIL_WORKERS is 0). Returns the future, or None.
+    """
+    if Image is None or not event.thumbnail:
+        return None
+    pk, category, name = event.pk, event.category, event.thumbnail.name
+    args = (event.thumbnail.path, str(settings.MEDIA_ROOT), name)
+    queued_at = time.monotonic()
+
+    if not settings.THUMBNAIL_WORKERS:
+        try:
+            RENDER_DURATION.observe(render_renditions(*args))
+            mark_ready(pk, category, name)
+            RENDITION_JOBS.inc(result='ok')
+            RENDITIONS_LATENCY.observe(time.monotonic() - queued_at)
+        except Exception:
+            RENDITION_JOBS.inc(result='error')
+            logger.exception('Could not generate the renditions of event %s (%s)', pk, name)
+        return None
+
+    try:
+        future = get_executor().submit(render_renditions, *args)
+    except BrokenProcessPool:
+        _reset_executor()
+        future = get_executor().submit(render_renditions, *args)
+    future.add_done_callback(lambda f: _on_done(pk, category, name, queued_at, f))
+    return future
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'events'
 
@@ -10,5 +10,9 @@ urlpatterns = [
     path('<int:pk>/edit/', views.event_update_view, name='event_update'),
     path('<int:pk>/delete/', views.event_delete_view, name='event_delete'),
     path('my-events/', views.my_events_view, name='my_events'),
-    path('category/<str:category>/', views.events_by_category_view, name='events_by_category')
-]
\ No newline at end of file
+    path('category/<str:category>/', views.events_by_category_view, name='events_by_category'),
+    path('cache-stats/', views.cache_stats_view, name='cache_stats'),
+    path('api/', api.event_list_api, name='api_event_list'),
+    path('api/<int:pk>/', api.event_detail_api, name='api_event_detail'),
+    path('api/export.ndjson', api.event_export_api, name='api_event_export'),
+]
@@ -1,58 +1,119 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.conf import settings
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpResponseForbidden
+from django.db import IntegrityError, transaction
+from django.http import HttpResponseForbidden, JsonResponse
+from django.utils.http import urlencode
 
 from .models import Event
-from .forms import EventCreationForm, EventUpdateForm, EventSearchForm
-
+from .forms import DUPLICATE_TITLE_ERROR, EventCreationForm, EventUpdateForm, EventSearchForm
+from .featured import get_featured_events
+from .caching import cache_stats, versioned_page_cache
+from .tags import normalize_tag, popular_tags
+from .pagination import CursorPaginator, approximate_count
+from .querybudget import query_budget
+
+EVENTS_PER_PAGE = 12
+LIST_PARAMS = ('search', 'category', 'status', 'tag', 'page', 'after', 'before')
+
+
+def event_list_scopes(request):
+    category = request.GET.get('category')
+    if category in dict(Event.CATEGORY_CHOICES):
+        return [f'category:{category}', 'featured', 'tags']
+    return ['list', 'featured', 'tags']
+
+
+def paginate_events(request, events, ranked=False):
+    """
+    Paginates an event queryset and returns the pagination context.
+    Uses keyset pagination unless the results are ranked by relevance or
+    the classic numbered mode is configured (EVENTS_PAGINATION = 'page').
+    """
+    params = sorted(
+        (key, value) for key, value in request.GET.items()
+        if value and key not in ('page', 'after', 'before')
+    )
+    context = {'filter_query': urlencode(params)}
+
+    if ranked or getattr(settings, 'EVENTS_PAGINATION', 'cursor') != 'cursor':
+        paginator = Paginator(events, EVENTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        context.update({
+            'page_obj': page_obj,
+            'object_list': page_obj,
+            'is_paginated': page_obj.has_other_pages(),
+            'paginator': paginator,
+        })
+        return context
+
+    page_obj = CursorPaginator(events, EVENTS_PER_PAGE).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context.update({
+        'page_obj': page_obj,
+        'object_list': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+        'cursor_pagination': True,
+    })
+    if getattr(settings, 'EVENTS_APPROXIMATE_COUNT', False):
+        context['approximate_count'] = approximate_count(events)
+    return context
+
+def save_event(form, event):
+    """
+    Saves the event. The forms already reject duplicated titles; the
+    (creator, title) unique constraint catches the race between two
+    concurrent saves. Returns False, with the error on the form, if the
+    creator already has an event with that title.
+    """
+    try:
+        with transaction.atomic():
+            event.save()
+    except IntegrityError:
+        form.add_error('title', DUPLICATE_TITLE_ERROR)
+        return False
+    form.save_m2m()
+    return True
+
+@versioned_page_cache(event_list_scopes, params=LIST_PARAMS)
+@query_budget(7)
 def event_list_view(request):
     search_form = EventSearchForm(request.GET)
     
-    events = Event.objects.all()
+    events = Event.objects.for_cards().order_by('-created_at')
+    search_query = None
+    current_tag = None
 
     if search_form.is_valid():
+        events = search_form.filter_events(events)
         search_query = search_form.cleaned_data.get('search')
-        category = search_form.cleaned_data.get('category')
-        status = search_form.cleaned_data.get('status')
-
-        if search_query:
-            events = events.filter(Q(title__icontains=search_query) | Q(description__icontains=search_query))
-        
-        if category:
-            events = events.filter(category=category)
-        
-        if status:
-            events = events.filter(status=status)
-
-    featured_events_qs = Event.objects.filter(is_featured__in=[True]).order_by()
-    
-    featured_events = sorted(featured_events_qs, key=lambda x: x.created_at, reverse=True)[:6]
-    
-    events = events.order_by('-created_at')
+        current_tag = normalize_tag(search_form.cleaned_data.get('tag')) or None
 
-    paginator = Paginator(events, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    featured_events = get_featured_events()
 
-    context = {
-        'page_obj': page_obj,
-        'object_list': page_obj,
-        'is_paginated': page_obj.has_other_pages(),
-        'paginator': paginator,
+    context = paginate_events(request, events, ranked=bool(search_query))
+    context.update({
         'featured_events': featured_events,
+        'popular_tags': popular_tags(),
+        'current_tag': current_tag,
         'search_form': search_form,
-    }
+    })
     return render(request, 'events/event_list.html', context)
 
+@versioned_page_cache(lambda request, pk: [f'event:{pk}'])
+@query_budget(4)
 def event_detail_view(request, pk):
-    event = get_object_or_404(Event, pk=pk)
+    event = get_object_or_404(Event.objects.select_related('creator'), pk=pk)
     is_creator = request.user == event.creator
     context = {
         'event': event,
         'is_creator': is_creator,
+        'live_updates': getattr(settings, 'LIVE_UPDATES', False),
     }
     return render(request, 'events/event_detail.html', context)
 
@@ -64,11 +125,10 @@ def event_create_view(request):
             event = form.save(commit=False)
             event.creator = request.user
             event.status = 'scheduled'
-            event.save()
-            messages.success(request, "Esdeveniment creat correctament!")
-            return redirect('events:event_detail', pk=event.pk)
-        else:
-            messages.error(request, "Hi ha errors al formulari.")
+            if save_event(form, event):
+                messages.success(request, "Esdeveniment creat correctament!")
+                return redirect('events:event_detail', pk=event.pk)
+        messages.error(request, "Hi ha errors al formulari.")
     else:
         form = EventCreationForm(user=request.user)
     
@@ -84,12 +144,10 @@ def event_update_view(request, pk):
 
     if request.method == 'POST':
         form = EventUpdateForm(request.POST, request.FILES, instance=event, user=request.user)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and save_event(form, form.save(commit=False)):
             messages.success(request, "Esdeveniment actualitzat correctament!")
             return redirect('events:event_detail', pk=pk)
-        else:
-            messages.error(request, "Hi ha errors al formulari.")
+        messages.error(request, "Hi ha errors al formulari.")
     else:
         form = EventUpdateForm(instance=event, user=request.user)
 
@@ -111,9 +169,10 @@ def event_delete_view(request, pk):
     return render(request, 'events/event_confirm_delete.html', {'event': event})
 
 @login_required
+@query_budget(3)
 def my_events_view(request):
     status_filter = request.GET.get('status')
-    events = Event.objects.filter(creator=request.user).order_by('-created_at')
+    events = Event.objects.for_cards(with_creator=False).filter(creator=request.user).order_by('-created_at')
     
     if status_filter:
         events = events.filter(status=status_filter)
@@ -125,26 +184,26 @@ def my_events_view(request):
     }
     return render(request, 'events/my_events.html', context)
 
+@versioned_page_cache(lambda request, category: [f'category:{category}', 'featured'], params=('after', 'before', 'page'))
+@query_budget(5)
 def events_by_category_view(request, category):
     valid_categories = [c[0] for c in Event.CATEGORY_CHOICES]
     if category not in valid_categories:
         messages.error(request, "Categoria no vàlida.")
         return redirect('events:event_list')
 
-    events = Event.objects.filter(category=category).order_by('-created_at')
+    events = Event.objects.for_cards().filter(category=category).order_by('-created_at')
     
-    paginator = Paginator(events, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
     form_initial = EventSearchForm(initial={'category': category})
 
-    context = {
-        'page_obj': page_obj,
-        'object_list': page_obj,
-        'is_paginated': page_obj.has_other_pages(),
-        'paginator': paginator,
+    context = paginate_events(request, events)
+    context.update({
+        'featured_events': get_featured_events(category=category),
         'category': category,
         'search_form': form_initial
-    }
-    return render(request, 'events/event_list.html', context)
\ No newline at end of file
+    })
+    return render(request, 'events/event_list.html', context)
+
+@staff_member_required
+def cache_stats_view(request):
+    return JsonResponse(cache_stats())
@@ -1,15 +1,20 @@
 # Register your models here.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db import models
+from config.uploads import SafeImageField
 from .models import CustomUser, Follow
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
-        ('Profile', {'fields': ('display_name', 'bio', 'avatar')}),
+        ('Profile', {'fields': ('display_name', 'bio', 'avatar', 'followers_count', 'following_count')}),
     )
-    list_display = ('username', 'email', 'display_name', 'is_staff', 'is_active')
+    list_display = ('username', 'email', 'display_name', 'followers_count', 'is_staff', 'is_active')
+    readonly_fields = ('followers_count', 'following_count')
     search_fields = ('username', 'email', 'display_name')
+    # Mostra els errors d'ImageUploadHandler (mida, format) en lloc de "fitxer buit"
+    formfield_overrides = {models.ImageField: {'form_class': SafeImageField}}
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+UserModel = get_user_model()
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Authenticates with the username or the email in a single indexed lookup
+    and runs the password hasher exactly once per attempt: also when no
+    user matches, so a miss takes as long as a wrong password.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = None
+        candidates = list(UserModel._default_manager.filter(Q(username=username) | Q(email=username))[:3])
+        by_username = [candidate for candidate in candidates if candidate.username == username]
+        if by_username:
+            user = by_username[0]
+        elif len(candidates) == 1:
+            # Un correu compartit per diversos comptes no identifica ningú
+            user = candidates[0]
+
+        if user is None:
+            # Hash de prova: iguala el temps de resposta amb el d'un usuari existent
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -7,6 +7,9 @@ from django.contrib.auth.password_validation import validate_password
 
 # Imports del meu model CustomUser
 from .models import CustomUser
+from .throttle import allow_login_attempt
+# Camp d'imatge que valida la pujada en streaming (mida, format i píxels)
+from config.uploads import SafeImageField
 
 # Import per validacions amb expressions regulars
 import re
@@ -102,7 +105,7 @@ class CustomUserUpdateForm(forms.ModelForm):
         label='Biografia'
     )    
     
-    avatar = forms.ImageField(
+    avatar = SafeImageField(
         required=False,
         widget=forms.ClearableFileInput(),
         label='Avatar',
@@ -120,19 +123,18 @@ class CustomAuthenticationForm(AuthenticationForm):
     username = forms.CharField(label="Nom d'usuari o correu electrònic")
     
     def clean(self):
-        usuarme_or_email = self.cleaned_data.get('username')
+        username_or_email = self.cleaned_data.get('username')
         password = self.cleaned_data.get('password')
         
-        if usuarme_or_email and password:
-            user = authenticate(self.request, username=usuarme_or_email, password=password)
-            
-            if user is None:
-                try: 
-                    user_obj = CustomUser.objects.get(email=usuarme_or_email)
-                    user = authenticate(self.request, username=user_obj.username, password=password)
-                    
-                except CustomUser.DoesNotExist:
-                    user = None
+        if username_or_email and password:
+            # Es comprova abans de calcular cap hash (protecció contra ràfegues d'intents)
+            if not allow_login_attempt(self.request, username_or_email):
+                raise ValidationError(
+                    "Massa intents d'inici de sessió. Torna-ho a provar d'aquí a uns minuts."
+                )
+
+            # Un sol authenticate(): UsernameOrEmailBackend accepta usuari o correu
+            user = authenticate(self.request, username=username_or_email, password=password)
                 
             if user is None:
                 raise ValidationError(
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from users.models import Follow
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = '🔁 Recalcula els comptadors de seguidors i seguits a partir de Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre d\'usuaris actualitzats per lot'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help='Només mostra quants comptadors s\'han desviat, sense corregir-los'
+        )
+
+    def handle(self, *args, **options):
+        # Dues agregacions en total, no una consulta per usuari
+        followers = dict(
+            Follow.objects.order_by().values_list('following').annotate(n=Count('id')).values_list('following', 'n')
+        )
+        following = dict(
+            Follow.objects.order_by().values_list('follower').annotate(n=Count('id')).values_list('follower', 'n')
+        )
+
+        drifted = []
+        users = User.objects.only('id', 'followers_count', 'following_count').order_by('pk')
+        for user in users.iterator(chunk_size=options['batch_size']):
+            expected = (followers.get(user.pk, 0), following.get(user.pk, 0))
+            if (user.followers_count, user.following_count) != expected:
+                user.followers_count, user.following_count = expected
+                drifted.append(user)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'⚠️  {len(drifted)} usuaris amb comptadors desviats'))
+            return
+
+        User.objects.bulk_update(
+            drifted, ['followers_count', 'following_count'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Corregits {len(drifted)} usuaris'))
@@ -1,15 +1,49 @@
+import random
+import time
+from itertools import accumulate
+from multiprocessing import Pool
+
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
 from django.db import transaction
+from django.db.models import Q
 from faker import Faker
 import unidecode
 
+from events.caching import bump_version
+from events.management.commands.seed_events import delete_events
+from events.models import Event
+from users.models import Follow
+
 # Obtenim el model d'usuari actiu a Django (pot ser User personalitzat)
 User = get_user_model()
 
-# Inicialitzem Faker amb configuració per espanyol
-faker = Faker('es_ES')
+# Exponent de la llei de potències dels seguidors (com més alt, més concentrats)
+FOLLOW_ALPHA = 1.1
+
+
+def generate_names(args):
+    """
+    Generates `count` (first_name, last_name, username) tuples. Runs in a
+    worker process when --workers > 1, so it must not touch the database.
+    """
+    count, seed = args
+    # Inicialitzem Faker amb configuració per espanyol
+    faker = Faker('es_ES')
+    if seed is not None:
+        faker.seed_instance(seed)
+    names = []
+    for _ in range(count):
+        first_name = faker.first_name()  # Nom aleatori
+        last_name = faker.last_name()    # Cognom aleatori
+        username = unidecode.unidecode(f"{first_name}.{last_name}".lower())  # Eliminar accents
+        username = ''.join(c for c in username if c.isalnum() or c == '.')  # Nom d'usuari net
+        names.append((first_name, last_name, username))
+    return names
+
 
 # Creem la classe de comanda
 class Command(BaseCommand):
@@ -35,27 +69,69 @@ class Command(BaseCommand):
             default=False,
             help='Crea relacions de seguiment aleatòries'
         )
+        parser.add_argument(
+            '--follows-per-user',
+            type=int,
+            default=20,
+            help='Mitjana de seguits per usuari (amb --with-follows)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de files per cada inserció massiva'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processos que generen les dades amb Faker'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Llavor aleatòria per obtenir sempre les mateixes dades'
+        )
+        parser.add_argument(
+            '--password',
+            default='password123',
+            help='Contrasenya de tots els usuaris de prova'
+        )
 
     # Funció principal que s'executa quan cridem la comanda
     def handle(self, *args, **options):
-        # Si s'ha passat --clear, eliminem els usuaris existents
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+
+        # Si s'ha passat --clear, eliminem els usuaris existents en bloc
         if options['clear']:
             self.stdout.write('🗑️  Eliminant usuaris existents...')
-            count = 0
             # Excloem els superusuaris per no eliminar l'admin
-            for user in User.objects.exclude(is_superuser=True):
-                user.delete()
-                count += 1
+            doomed = User.objects.exclude(is_superuser=True)
+            # Els seguiments s'esborren amb un sol DELETE, sense un senyal per fila
+            follows = Follow.objects.filter(Q(follower__in=doomed.values('pk')) | Q(following__in=doomed.values('pk')))
+            follows._raw_delete(follows.db)
+            # Els seus esdeveniments també: sense això, doomed.delete() els esborraria un per un amb els senyals
+            event_ids = list(Event.objects.filter(creator__in=doomed.values('pk')).values_list('pk', flat=True))
+            delete_events(event_ids, batch_size=self.batch_size)
+            if event_ids:
+                bump_version('list', 'featured', 'tags', *(f'category:{category}' for category, _ in Event.CATEGORY_CHOICES))
+            count = doomed.count()
+            doomed.delete()
+            call_command('reconcile_follow_counts', stdout=self.stdout)
             self.stdout.write(self.style.SUCCESS(f'✅ Eliminats {count} usuaris'))
 
-        # Creem els grups i els usuaris dins d'una transacció atòmica
-        with transaction.atomic():
-            groups = self.create_groups()  # Creem grups si no existeixen
-            users_created = self.create_users(options['users'], groups)  # Creem usuaris
+        groups = self.create_groups()  # Creem grups si no existeixen
+        users_created = self.create_admin()
+        users_created += self.create_users(options, groups)  # Creem usuaris
 
         # Missatge final
         self.stdout.write(self.style.SUCCESS(f'✅ {users_created} usuaris creats correctament!'))
 
+        if options['with_follows']:
+            self.create_follows(options['follows_per_user'])
+
     # Funció que crea grups per roles si no existeixen
     def create_groups(self):
         group_names = ['Organitzadors', 'Participants', 'Moderadors']
@@ -67,11 +143,8 @@ class Command(BaseCommand):
                 self.stdout.write(f'  ✓ Grup "{name}" creat')
         return groups  # Retornem diccionari de grups
 
-    # Funció que crea els usuaris de prova
-    def create_users(self, num_users, groups):
-        users_created = 0
-
-        # Creem un superusuari admin fix
+    # Creem un superusuari admin fix
+    def create_admin(self):
         admin, created = User.objects.get_or_create(
             username='admin',
             defaults={
@@ -87,64 +160,119 @@ class Command(BaseCommand):
             admin.set_password('admin123')  # Password inicial
             admin.save()
             self.stdout.write('  ✓ Superusuari admin creat')
-            users_created += 1
+        return int(created)
 
+    # Blocs de noms generats amb Faker (en paral·lel si hi ha --workers)
+    def name_chunks(self, total, workers, seed):
+        specs = []
+        for index, start in enumerate(range(0, total, self.batch_size)):
+            specs.append((min(self.batch_size, total - start), None if seed is None else seed + index))
+        if workers <= 1:
+            yield from map(generate_names, specs)
+            return
+        with Pool(workers) as pool:
+            yield from pool.imap(generate_names, specs)
+
+    # Funció que crea els usuaris de prova per blocs
+    def create_users(self, options, groups):
+        total = options['users']
+        if total <= 0:
+            return 0
+
+        # Un sol hash PBKDF2 per a tots: és el pas més lent de crear un usuari
+        password = make_password(options['password'])
         # Obtenim tots els usernames existents per evitar duplicats
         existing_usernames = set(User.objects.values_list('username', flat=True))
+        Membership = User.groups.through
 
-        # Creació d'usuaris de prova
-        for i in range(1, num_users + 1):
-            first_name = faker.first_name()  # Nom aleatori
-            last_name = faker.last_name()    # Cognom aleatori
-            base_username = f"{first_name}.{last_name}".lower()
-            username = unidecode.unidecode(base_username)  # Eliminar accents
-            username = ''.join(c for c in username if c.isalnum() or c == '.')  # Nom d'usuari net
-
-            # Garantir unicitat del username
-            suffix = 1
-            unique_username = username
-            while unique_username in existing_usernames:
-                unique_username = f"{username}{suffix}"
-                suffix += 1
-            existing_usernames.add(unique_username)
-
-            # Assignar rol i emoji segons el número d'usuari
-            if i % 5 == 0:
-                role = 'Organitzador'
-                emoji = '🎯'
-                group = groups['Organitzadors']
-            elif i % 3 == 0:
-                role = 'Moderador'
-                emoji = '🛡️'
-                group = groups['Moderadors']
-            else:
-                role = 'Participant'
-                emoji = ''
-                group = groups['Participants']
-
-            # Nom complet amb emoji
-            display_name = f"{emoji} {first_name} {last_name}".strip()
-            # Biografia de prova
-            bio = f"{role} d'esdeveniments en streaming, m'encanta la tecnologia i connectar amb la comunitat!"
-
-            # Creem l'usuari
-            user, created = User.objects.get_or_create(
-                username=unique_username,
-                defaults={
-                    'email': f"{unique_username}@streamevents.com",
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'display_name': display_name,
-                    'bio': bio,
-                    'is_active': True,
-                }
-            )
+        created = 0
+        number = 0
+        start = time.monotonic()
+        for names in self.name_chunks(total, options['workers'], options['seed']):
+            users = []
+            roles = {}
+            for first_name, last_name, username in names:
+                number += 1
+                # Garantir unicitat del username
+                suffix = 1
+                unique_username = username
+                while unique_username in existing_usernames:
+                    unique_username = f"{username}{suffix}"
+                    suffix += 1
+                existing_usernames.add(unique_username)
 
-            if created:
-                user.set_password('password123')  # Password inicial
-                user.groups.add(group)  # Assignem el grup
-                user.save()
-                users_created += 1
-                self.stdout.write(f'  ✓ Usuari {unique_username} ({role}) creat')
+                # Assignar rol i emoji segons el número d'usuari
+                if number % 5 == 0:
+                    role, emoji, group = 'Organitzador', '🎯', groups['Organitzadors']
+                elif number % 3 == 0:
+                    role, emoji, group = 'Moderador', '🛡️', groups['Moderadors']
+                else:
+                    role, emoji, group = 'Participant', '', groups['Participants']
+                roles[unique_username] = group.pk
+
+                users.append(User(
+                    username=unique_username,
+                    email=f"{unique_username}@streamevents.com",
+                    first_name=first_name,
+                    last_name=last_name,
+                    # Nom complet amb emoji
+                    display_name=f"{emoji} {first_name} {last_name}".strip(),
+                    # Biografia de prova
+                    bio=f"{role} d'esdeveniments en streaming, m'encanta la tecnologia i connectar amb la comunitat!",
+                    password=password,
+                    is_active=True,
+                ))
+
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=self.batch_size)
+                # Llegim els ids en una consulta (no tots els backends els retornen)
+                ids = User.objects.filter(username__in=list(roles)).values_list('username', 'pk')
+                Membership.objects.bulk_create(
+                    [Membership(customuser_id=pk, group_id=roles[username]) for username, pk in ids],
+                    batch_size=self.batch_size,
+                )
+
+            created += len(users)
+            elapsed = time.monotonic() - start
+            self.stdout.write(f'  ✓ {created}/{total} usuaris ({created / elapsed:.0f} usuaris/s)')
+
+        return created
+
+    # Graf de seguiment amb llei de potències: pocs usuaris molt seguits
+    def create_follows(self, follows_per_user):
+        self.stdout.write('🔗 Creant relacions de seguiment...')
+        user_ids = list(User.objects.filter(is_superuser=False).order_by('pk').values_list('pk', flat=True))
+        if len(user_ids) < 2:
+            self.stdout.write(self.style.WARNING('⚠️  Calen almenys dos usuaris per crear seguiments'))
+            return
+
+        # Popularitat de Zipf sobre un ordre aleatori dels usuaris
+        ranked = user_ids[:]
+        self.random.shuffle(ranked)
+        cum_weights = list(accumulate(1 / (rank + 1) ** FOLLOW_ALPHA for rank in range(len(ranked))))
+        max_follows = len(user_ids) - 1
+
+        created = 0
+        pending = []
+        start = time.monotonic()
+        for follower_id in user_ids:
+            # Quantitat de seguits per usuari: exponencial al voltant de la mitjana
+            wanted = min(max_follows, max(1, int(self.random.expovariate(1 / follows_per_user))))
+            targets = set(self.random.choices(ranked, cum_weights=cum_weights, k=wanted))
+            targets.discard(follower_id)
+            pending.extend(Follow(follower_id=follower_id, following_id=target) for target in targets)
+
+            if len(pending) >= self.batch_size:
+                created += self.insert_follows(pending)
+                pending = []
+                elapsed = time.monotonic() - start
+                self.stdout.write(f'  ✓ {created} seguiments ({created / elapsed:.0f} seguiments/s)')
+        created += self.insert_follows(pending)
+
+        # bulk_create no envia senyals: recalculem els comptadors desnormalitzats
+        call_command('reconcile_follow_counts', batch_size=self.batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'✅ {created} seguiments creats correctament!'))
 
-        return users_created  # Retornem el nombre d'usuaris creats
\ No newline at end of file
+    def insert_follows(self, follows):
+        Follow.objects.bulk_create(follows, batch_size=self.batch_size, ignore_conflicts=True)
+        return len(follows)
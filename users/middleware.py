@@ -0,0 +1,86 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+MAX_CACHED_USERS = 10000
+
+_users = OrderedDict()
+_lock = threading.Lock()
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drops a user from this process cache (after editing its profile or
+    password). Other processes catch up when AUTH_USER_CACHE_TIMEOUT expires.
+    """
+    with _lock:
+        _users.pop(str(user_id), None)
+
+
+def _cached(user_id, backend_path):
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is None:
+            return None
+        expires, backend, user = entry
+        if expires < time.monotonic() or backend != backend_path:
+            del _users[user_id]
+            return None
+        _users.move_to_end(user_id)
+        return user
+
+
+def _store(user_id, backend_path, user, timeout):
+    with _lock:
+        _users[user_id] = (time.monotonic() + timeout, backend_path, user)
+        _users.move_to_end(user_id)
+        while len(_users) > MAX_CACHED_USERS:
+            _users.popitem(last=False)
+
+
+def get_cached_user(request):
+    """
+    Same result as django.contrib.auth.get_user(), but an authenticated
+    user is kept in memory for AUTH_USER_CACHE_TIMEOUT seconds. A hit only
+    checks the session hash (so a password change still logs other sessions
+    out) and returns a shallow copy, so a view changing request.user cannot
+    alter the cached instance.
+    """
+    timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return auth.get_user(request)
+
+    user_id = request.session.get(SESSION_KEY)
+    backend_path = request.session.get(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    user_id = str(get_user_model()._meta.pk.to_python(user_id))
+    user = _cached(user_id, backend_path)
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if user is not None and session_hash and constant_time_compare(session_hash, user.get_session_auth_hash()):
+        return copy.copy(user)
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        _store(user_id, backend_path, copy.copy(user), timeout)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware that loads request.user through get_cached_user,
+    so a request whose session did not change needs no query for the user.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
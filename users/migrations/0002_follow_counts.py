@@ -0,0 +1,34 @@
+# Generated by Django 4.0.10 on 2026-10-18 05:34
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_follow_counts(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Follow = apps.get_model('users', 'Follow')
+    for field, column in (('followers_count', 'following'), ('following_count', 'follower')):
+        counts = Follow.objects.order_by().values_list(column).annotate(n=Count('id')).values_list(column, 'n')
+        for pk, n in counts:
+            CustomUser.objects.filter(pk=pk).update(**{field: n})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,15 @@ class CustomUser(AbstractUser):
     bio = models.TextField(blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
     # Necessita Pillow instal·lat
+    # Comptadors desnormalitzats de Follow (es mantenen des de users.signals)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Inici de sessió amb correu (users.backends)
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
 
     def __str__(self):
         return self.username
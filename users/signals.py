@@ -0,0 +1,26 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CustomUser, Follow
+from .social import remember_follow
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if not created:
+        return
+    CustomUser.objects.filter(pk=instance.following_id).update(followers_count=F('followers_count') + 1)
+    CustomUser.objects.filter(pk=instance.follower_id).update(following_count=F('following_count') + 1)
+    remember_follow(instance.follower_id, instance.following_id, True)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    CustomUser.objects.filter(pk=instance.following_id, followers_count__gt=0).update(
+        followers_count=F('followers_count') - 1,
+    )
+    CustomUser.objects.filter(pk=instance.follower_id, following_count__gt=0).update(
+        following_count=F('following_count') - 1,
+    )
+    remember_follow(instance.follower_id, instance.following_id, False)
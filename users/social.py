@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Follow
+
+FOLLOW_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def follow_key(follower_id, creator_id):
+    return f'users:follows:{follower_id}:{creator_id}'
+
+
+def follow(follower, creator):
+    """
+    Makes `follower` follow `creator`. Returns False if it already did.
+    """
+    try:
+        with transaction.atomic():
+            Follow.objects.create(follower=follower, following=creator)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(follower, creator):
+    """
+    Removes the follow (and its signals update the counters). Returns False
+    if `follower` did not follow `creator`.
+    """
+    deleted, _ = Follow.objects.filter(follower=follower, following=creator).delete()
+    return bool(deleted)
+
+
+def remember_follow(follower_id, creator_id, following):
+    cache.set(follow_key(follower_id, creator_id), following, FOLLOW_CACHE_TIMEOUT)
+
+
+def following_map(user, creator_ids):
+    """
+    Returns {creator_id: bool} telling whether `user` follows each creator.
+    One cache round trip for the whole page, plus at most one query for the
+    creators that were not cached yet.
+    """
+    creator_ids = set(creator_ids)
+    if not user.is_authenticated or not creator_ids:
+        return {creator_id: False for creator_id in creator_ids}
+
+    keys = {follow_key(user.pk, creator_id): creator_id for creator_id in creator_ids}
+    cached = cache.get_many(keys)
+    result = {keys[key]: value for key, value in cached.items()}
+
+    missing = creator_ids - result.keys()
+    if missing:
+        followed = set(
+            Follow.objects.filter(follower=user, following_id__in=missing).values_list('following_id', flat=True)
+        )
+        fresh = {creator_id: creator_id in followed for creator_id in missing}
+        cache.set_many(
+            {follow_key(user.pk, creator_id): value for creator_id, value in fresh.items()},
+            FOLLOW_CACHE_TIMEOUT,
+        )
+        result.update(fresh)
+    return result
+
+
+def is_following(user, creator):
+    return following_map(user, [creator.pk])[creator.pk]
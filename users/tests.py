@@ -1,3 +1,173 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from events.models import Event, SearchTerm, Tag, TimelineEntry
+
+from .models import Follow
+
+User = get_user_model()
+
+
+class LoginTests(TestCase):
+    """
+    Login with the username or the email (users.backends.UsernameOrEmailBackend)
+    and the login throttle (users.throttle).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('anna.puig', 'anna@streamevents.com', 'password123')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username, password='password123'):
+        return self.client.post(reverse('users:login'), {'username': username, 'password': password})
+
+    def assertLoggedIn(self, response):
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+    def test_login_with_username(self):
+        self.assertLoggedIn(self.login('anna.puig'))
+
+    def test_login_with_email(self):
+        self.assertLoggedIn(self.login('anna@streamevents.com'))
+
+    def test_wrong_password(self):
+        response = self.login('anna.puig', 'contrasenya-incorrecta')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_unknown_user(self):
+        response = self.login('ningu@streamevents.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_shared_email_does_not_identify_anyone(self):
+        User.objects.create_user('anna.altra', 'anna@streamevents.com', 'password123')
+        self.assertEqual(self.login('anna@streamevents.com').status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        # Amb el nom d'usuari continua funcionant
+        self.assertLoggedIn(self.login('anna.puig'))
+
+    def test_inactive_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.login('anna.puig').status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    @override_settings(LOGIN_THROTTLE={'account': (2, 0.001), 'ip': (50, 1)})
+    def test_throttle_blocks_even_the_right_password(self):
+        self.login('anna.puig', 'incorrecta')
+        self.login('ANNA.PUIG ', 'incorrecta')
+        response = self.login('anna.puig')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        self.assertContains(response, "Massa intents")
+
+    @override_settings(LOGIN_THROTTLE={'account': (1, 0.001), 'ip': (3, 0.001)})
+    def test_locked_account_does_not_drain_the_ip_budget(self):
+        for _ in range(5):
+            self.login('anna.puig', 'incorrecta')
+        # Només el primer intent ha gastat el testimoni de la IP
+        User.objects.create_user('pere.vila', 'pere@streamevents.com', 'password123')
+        response = self.login('pere.vila')
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+
+class SeedUsersClearTests(TestCase):
+    """
+    seed_users --clear deletes the events of the removed users with raw
+    DELETEs (no per-row signals) and keeps the tag counts right.
+    """
+
+    def create_event(self, creator, title, tags):
+        return Event.objects.create(
+            title=title, description='Descripció', category='gaming', status='scheduled',
+            scheduled_date=timezone.now() + timedelta(days=1), tags=tags, creator=creator,
+        )
+
+    def test_clear(self):
+        admin = User.objects.create_superuser('admin', 'admin@streamevents.com', 'admin123')
+        user = User.objects.create_user('anna.puig', 'anna@streamevents.com', 'password123')
+        kept = self.create_event(admin, 'Es queda', 'minecraft')
+        self.create_event(user, 'Torneig', 'minecraft, speedrun')
+        self.create_event(user, 'Final', 'speedrun')
+        TimelineEntry.objects.create(user=admin, event=Event.objects.get(title='Torneig'), creator=user,
+                                     scheduled_date=timezone.now())
+
+        with mock.patch('events.signals.release_event_tags') as release_tags:
+            call_command('seed_users', users=1, clear=True, seed=1, stdout=io.StringIO())
+        release_tags.assert_not_called()
+
+        self.assertEqual(list(Event.objects.all()), [kept])
+        self.assertFalse(User.objects.filter(username='anna.puig').exists())
+        self.assertEqual(set(SearchTerm.objects.values_list('event_id', flat=True)), {kept.pk})
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(dict(Tag.objects.values_list('name', 'event_count')), {'minecraft': 1, 'speedrun': 0})
+
+
+class FollowCountTests(TestCase):
+    """
+    followers_count and following_count move with F() updates on follow and
+    unfollow, and reconcile_follow_counts repairs any drift.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anna = User.objects.create_user('anna.puig', 'anna@streamevents.com', 'password123')
+        cls.pere = User.objects.create_user('pere.vila', 'pere@streamevents.com', 'password123')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.anna)
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.followers_count, user.following_count
+
+    def follow(self, username):
+        return self.client.post(reverse('users:follow', args=[username]))
+
+    def test_follow_and_unfollow(self):
+        self.follow('pere.vila')
+        self.follow('pere.vila')  # Seguir dues vegades no compta doble
+        self.assertEqual(self.counts(self.pere), (1, 0))
+        self.assertEqual(self.counts(self.anna), (0, 1))
+
+        self.client.post(reverse('users:unfollow', args=['pere.vila']))
+        self.client.post(reverse('users:unfollow', args=['pere.vila']))
+        self.assertEqual(self.counts(self.pere), (0, 0))
+        self.assertEqual(self.counts(self.anna), (0, 0))
+
+    def test_cannot_follow_yourself(self):
+        self.follow('anna.puig')
+        self.assertEqual(self.counts(self.anna), (0, 0))
+
+    def test_counters_never_go_negative(self):
+        follow = Follow.objects.create(follower=self.anna, following=self.pere)
+        User.objects.update(followers_count=0, following_count=0)
+        follow.delete()
+        self.assertEqual(self.counts(self.pere), (0, 0))
+
+    def test_reconcile(self):
+        Follow.objects.create(follower=self.anna, following=self.pere)
+        Follow.objects.create(follower=self.pere, following=self.anna)
+        User.objects.filter(pk=self.anna.pk).update(followers_count=7, following_count=0)
+
+        output = io.StringIO()
+        call_command('reconcile_follow_counts', dry_run=True, stdout=output)
+        self.assertIn('1 usuaris', output.getvalue())
+        self.assertEqual(self.counts(self.anna), (7, 0))
+
+        call_command('reconcile_follow_counts', stdout=io.StringIO())
+        self.assertEqual(self.counts(self.anna), (1, 1))
+        self.assertEqual(self.counts(self.pere), (1, 1))
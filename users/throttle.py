@@ -0,0 +1,52 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _tokens(key, capacity, refill_rate, now):
+    tokens, updated = cache.get(key, (capacity, now))
+    return min(capacity, tokens + (now - updated) * refill_rate)
+
+
+def take_tokens(buckets, now=None):
+    """
+    Token buckets stored in the cache: `capacity` attempts in a burst, then
+    `refill_rate` attempts per second. `buckets` is a list of
+    (key, (capacity, refill_rate)). A token is taken from every bucket only
+    if none of them is empty; otherwise nothing is consumed and it returns
+    False, so a locked bucket does not drain the others.
+    The read-modify-write is not atomic, so concurrent requests may get a
+    token or two more than the limit; it is a CPU guard, not an exact quota.
+    """
+    now = now or time.time()
+    levels = [(key, capacity, refill_rate, _tokens(key, capacity, refill_rate, now))
+              for key, (capacity, refill_rate) in buckets]
+    if any(tokens < 1 for _, _, _, tokens in levels):
+        return False
+    for key, capacity, refill_rate, tokens in levels:
+        cache.set(key, (tokens - 1, now), int(capacity / refill_rate) + 1)
+    return True
+
+
+def client_ip(request):
+    # Darrere d'un proxy cal que aquest posi l'adreça real a REMOTE_ADDR
+    return request.META.get('REMOTE_ADDR', '') if request is not None else ''
+
+
+def allow_login_attempt(request, identifier):
+    """
+    Consumes one login attempt from the buckets of the account and of the
+    client IP (LOGIN_THROTTLE). Returns False if either one is exhausted,
+    before any password gets hashed.
+    """
+    limits = getattr(settings, 'LOGIN_THROTTLE', None)
+    if not limits:
+        return True
+    account = hashlib.sha256(identifier.strip().lower().encode()).hexdigest()
+    buckets = [
+        (f'users:throttle:account:{account}', limits.get('account')),
+        (f'users:throttle:ip:{client_ip(request)}', limits.get('ip')),
+    ]
+    return take_tokens([(key, limit) for key, limit in buckets if limit])
@@ -11,4 +11,6 @@ urlpatterns = [
     path('profile/', views.profile_view, name='profile'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'),
     path('profile/<str:username>/', views.public_profile_view, name='public_profile'),
+    path('profile/<str:username>/follow/', views.follow_view, name='follow'),
+    path('profile/<str:username>/unfollow/', views.unfollow_view, name='unfollow'),
 ]
\ No newline at end of file
@@ -1,9 +1,12 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.views.decorators.http import require_POST
 from .forms import CustomUserCreationForm, CustomUserUpdateForm, CustomAuthenticationForm, CustomPasswordResetForm
 from .models import CustomUser
+from .middleware import invalidate_cached_user
+from .social import follow, is_following, unfollow
 
 # Create your views here.
 def register_view(request):
@@ -42,7 +45,9 @@ def login_view(request):
             return redirect('home')
         
         else:
-            messages.error(request, 'Nom d\'usuari o contrasenya incorrectes. Si us plau, torna-ho a intentar.')
+            # Errors del formulari (credencials o massa intents), o el missatge genèric
+            errors = ' '.join(form.non_field_errors())
+            messages.error(request, errors or 'Nom d\'usuari o contrasenya incorrectes. Si us plau, torna-ho a intentar.')
             
     else:
         form = CustomAuthenticationForm()
@@ -74,6 +79,7 @@ def edit_profile_view(request):
         
         if form.is_valid():
             form.save()
+            invalidate_cached_user(user.pk)
             messages.success(request, "El teu perfil s'ha actualitzat correctament!")
             return redirect('users:public_profile', username=request.user.username)
         
@@ -97,8 +103,27 @@ def public_profile_view(request, username):
     
     return render(request, "users/public_profile.html", {
         'profile_user': user,
+        'is_following': user != request.user and is_following(request.user, user),
         'title': f'Perfil de {user.username}'
     })
+
+@login_required
+@require_POST
+def follow_view(request, username):
+    user = get_object_or_404(CustomUser, username=username)
+    if user == request.user:
+        messages.error(request, "No et pots seguir a tu mateix.")
+    elif follow(request.user, user):
+        messages.success(request, f"Ara segueixes a {user.username}.")
+    return redirect('users:public_profile', username=user.username)
+
+@login_required
+@require_POST
+def unfollow_view(request, username):
+    user = get_object_or_404(CustomUser, username=username)
+    if unfollow(request.user, user):
+        messages.info(request, f"Has deixat de seguir a {user.username}.")
+    return redirect('users:public_profile', username=user.username)
     
 @login_required
 def change_password_view(request):
@@ -108,6 +133,7 @@ def change_password_view(request):
         form = CustomPasswordResetForm(user=user, data=request.POST)
         if form.is_valid():
             form.save()
+            invalidate_cached_user(user.pk)
             messages.success(request, "Has canviat la contrasenya correctament!")
             return redirect('home')
         else: